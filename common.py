@@ -0,0 +1,903 @@
+"""Common
+
+The functions shared by the Sierpinski Tree and the Snowmandelbrot: some
+geometry and color utilities, the chaos game engine (affine maps and their
+transition tables, the vectorized game itself, played on a pool of processes
+or streamed in chunks), the fractals' generators, point clouds, and the
+functions that plot the points onto pygame surfaces
+Both `sierpinski-tree/utils.py` and `snowmandelbrot/utils.py` import it
+"""
+
+import collections
+import contextlib
+import functools
+import math
+import multiprocessing
+import multiprocessing.resource_tracker
+import os
+import random
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import numpy as np
+import pygame
+
+
+# some useful constants
+pi = math.pi
+# RGB values for some frequently used colors
+red = (255, 0, 0)
+green = (0, 255, 0)
+blue = (0, 0, 255)
+white = (255, 255, 255)
+black = (0, 0, 0)
+cyan = (0, 255, 255)
+
+
+# returns a range of numbers from 0 to r-1 (both inclusive),
+# such that none of the numbers is a neighbour of i
+def remove_neighbours(r, i):
+    l = list(range(r))
+    return [l[k] for k in range(len(l)) if (k+1)%r != i and (k-1)%r != i]
+
+
+# the signum function, implemented using
+# short-circuiting of the boolean operators
+def sgn(x):
+    return (x != 0 and int(x/abs(x))) or 0
+
+
+# "extended" arctan function :
+# gives the angle from (a, b) to (c, d) in the range [0, 2pi)
+# LaTeX verison: https://imgur.com/a/Q30wEVR
+# (I came up with this myself)
+def eatan(a, b, c, d):
+    # if a = c, returns pi/2 or 3pi/2, based on b and d
+    if a == c:
+        return pi/2*(2 + sgn(b-d))
+    # else, employs the formula from the image
+    return math.atan((b-d)/(a-c)) + pi*sgn(1 + sgn(a-c)) + 2*pi*sgn(sgn(a-c) - 1)*sgn(sgn(d-b) - 1)
+
+
+# the same as eatan, for whole arrays of points (c, d) at once
+def eatan_array(a, b, c, d):
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        angle = np.arctan((b-d)/(a-c)) + pi*(a > c) + 2*pi*((a < c) & (d <= b))
+    return np.where(a == c, pi/2*(2 + np.sign(b-d)), angle)
+
+
+# gives the abscissa of the point that divides the
+# segment from (k1, 0) to (k2, 0) in the ratio r : (1-r)
+def ratio_div(k1, k2, r):
+    return ((1-r)*k1 + r*k2)
+
+
+# internal division in the ratio r : (1-r) for two 3-tuples
+# (mostly used here to help make color gradients)
+def ratio_div_3d(t1, t2, r):
+    if r <= 0:
+        return t1
+    elif r >= 1:
+        return t2
+    return (ratio_div(t1[0], t2[0], r), ratio_div(t1[1], t2[1], r), ratio_div(t1[2], t2[2], r))
+
+
+# the same as ratio_div_3d, for arrays of 3-tuples (or single ones) t1 and t2,
+# and an array of ratios r, all at once
+def ratio_div_3d_array(t1, t2, r):
+    r = np.clip(r, 0, 1)[..., None]
+    return (1-r)*np.asarray(t1, dtype = np.float64) + r*np.asarray(t2, dtype = np.float64)
+
+
+# dividing two 2-tuples in the ratio r : 1-r
+def ratio_div_2d(p1, p2, r):
+    return (ratio_div(p1[0], p2[0], r), ratio_div(p1[1], p2[1], r))
+
+
+# mid-point of two 2-tuples
+def midpoint_2d(p1, p2):
+    return ratio_div_2d(p1, p2, 0.5)
+
+
+# generates a 'color function' that will correspond to a 'circular gradient',
+# which is described below
+#
+# for some point (x, y), let r be it's distance from (x0, y0) and theta
+#       be the angle it makes with y = y0, in the range [0, 2pi), then the
+#       colors depend on theta like so:
+#
+#             0 < theta < 2pi/n -> linear gradient b/n cols[0] and cols[1]
+#         2pi/n < theta < 4pi/n -> linear gradient b/n cols[1] and cols[2]
+#                     ...       ->                ...
+#     (n-1)*2pi/n < theta < 2pi -> linear gradient b/n cols[-1] and cols[0]
+#
+# let the color given by the above conditions be denoted by c. Then the final
+#       color varies linearly from white to c, with the factor r/r_max, i.e.
+#                   (1-r/r_max)*white + r/r_max*c
+# the function's `vectorized` attribute is it's array version (see
+# circ_gradient_array), for coloring whole arrays of points at once
+def circ_gradient(x0, y0, cols, r_max, offset=0):
+    def func(pt):
+        ncols = len(cols)       # number of colors
+        phi = 2*pi/ncols        # angle between two successive colors
+        x = pt[0]
+        y = pt[1]
+        r = (x**2 + y**2)**0.5
+        theta = (eatan(x0, y0, x, y) - offset) % (2*pi)
+        lval = int(theta/phi)
+        col = ratio_div_3d(cols[lval], cols[(lval+1) % ncols], theta/phi - math.floor(theta/phi))
+        return ratio_div_3d((255, 255, 255), col, r/r_max)
+    func.vectorized = circ_gradient_array(x0, y0, cols, r_max, offset)
+    return func
+
+
+# the array version of circ_gradient: returns a function that takes arrays of
+# the points' coordinates, x and y, and gives all of their colors at once, as
+# an (N, 3) uint8 array (the colors circ_gradient's function gives them, with
+# their fractional parts truncated, as set_at does)
+def circ_gradient_array(x0, y0, cols, r_max, offset = 0):
+    ncols = len(cols)
+    phi = 2*pi/ncols
+    cols = np.array(cols, dtype = np.float64)
+    def func(x, y):
+        x = np.asarray(x, dtype = np.float64)
+        y = np.asarray(y, dtype = np.float64)
+        r = (x**2 + y**2)**0.5
+        theta = (eatan_array(x0, y0, x, y) - offset) % (2*pi)
+        lval = (theta/phi).astype(np.intp)
+        col = ratio_div_3d_array(cols[lval], cols[(lval+1) % ncols], theta/phi - np.floor(theta/phi))
+        return ratio_div_3d_array((255, 255, 255), col, r/r_max).astype(np.uint8)
+    return func
+
+
+# generates a color function that corresponds to a radial gradient centered
+# at (x0, y0), from cols[0] to cols[1], where cols[1] is fully attained at r_max
+# (with it's array version as it's `vectorized` attribute, see radial_gradient_array)
+def radial_gradient(x0, y0, cols, r_max):
+    def func(pt):
+        col1, col2 = cols
+        x = pt[0]
+        y = pt[1]
+        r = ((x-x0)**2 + (y-y0)**2)**0.5
+        return ratio_div_3d(col1, col2, r/r_max)
+    func.vectorized = radial_gradient_array(x0, y0, cols, r_max)
+    return func
+
+
+# the array version of radial_gradient, like circ_gradient_array
+def radial_gradient_array(x0, y0, cols, r_max):
+    def func(x, y):
+        x = np.asarray(x, dtype = np.float64)
+        y = np.asarray(y, dtype = np.float64)
+        r = ((x-x0)**2 + (y-y0)**2)**0.5
+        return ratio_div_3d_array(cols[0], cols[1], r/r_max).astype(np.uint8)
+    return func
+
+
+# random point inside a rectangle
+# (x, y) -> bottom left corner
+# l x w  -> dimensions
+def rand_rect(x, y, l, w):
+    return (x + random.random()*l, y + random.random()*w)
+
+
+# random point inside a circle
+# (x, y) -> centre
+# r      -> radius
+def rand_circ(x, y, r):
+    rand_r = random.random()*r
+    rand_theta = random.random()*2*pi
+    return (x + rand_r*math.cos(rand_theta), y + rand_r*math.sin(rand_theta))
+
+
+# evaluates the point at a distance of `l` units from
+# pt, making an angle `a` with the line `y = pt[1]`
+def polar_sum(pt, l, a):
+    return (pt[0] + l*math.cos(a), pt[1] + l*math.sin(a))
+
+
+# the affine map p -> mat @ p + offset, for a jump `ratio` of the way from p
+# towards `vertex`, as a (mat, offset) pair (see ifs_pts)
+def jump_map(vertex, ratio):
+    return (((1 - ratio), 0), (0, (1 - ratio))), (ratio*vertex[0], ratio*vertex[1])
+
+
+# the transition table of a chaos game with n maps, where the next map to be
+# chosen depends on the last two, as an (n+1, n+1, n) array: table[last,
+# second_last] holds the probabilities of the next map being each of the n
+# maps, with the index n standing for "none chosen yet"
+# rule(last, second_last) gives the maps allowed next (last and second_last
+# being None at the start), each of which is equally likely to be chosen;
+# with no rule, every map is allowed every time
+def transition_table(n, rule = None):
+    table = np.ones((n+1, n+1, n))
+    if rule is not None:
+        states = list(range(n)) + [None]
+        for last in states:
+            for second_last in states:
+                table[n if last is None else last, n if second_last is None else second_last] = 0
+                table[n if last is None else last, n if second_last is None else second_last, list(rule(last, second_last))] = 1
+
+    return table/table.sum(axis = -1, keepdims = True)
+
+
+# generates points of the attractor of an iterated function system, i.e. the
+# affine maps `maps` (as (mat, offset) pairs, see jump_map), by playing the
+# chaos game with many accumulator points ("chains") at once: all of them start
+# off at `start`, and are then repeatedly sent through randomly chosen maps,
+# according to the transition table `table` (see transition_table; every map
+# is equally likely every time, if None); yields npts of the points visited,
+# in (N, 2) arrays of about `chunk` points each
+# there are `chains` chains (about sqrt(npts), if None), each of which takes
+# about npts/chains steps, so every step is taken by all the chains together,
+# in NumPy, and the random numbers for a whole chunk are drawn at once; a
+# restricted game only costs a lookup in the table more per step than an
+# unrestricted one
+# the first `burn` steps of every chain are left out of the output, by which
+# time the chains have reached the fractal (and gone their separate ways), so
+# there are no stray points from their way there
+# rng is a NumPy random generator (seeded from the random module, if None)
+def ifs_chunks(maps, start, npts, table = None, chains = None, burn = 64, rng = None, chunk = 2**20):
+    mats = np.array([m[0] for m in maps], dtype = np.float64).reshape(-1, 2, 2)
+    offsets = np.array([m[1] for m in maps], dtype = np.float64).reshape(-1, 2)
+    n = len(mats)
+    if table is None:
+        table = transition_table(n)
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+    chains = min(chains or max(1, math.isqrt(npts)), max(1, npts))
+    steps = -(-npts//chains)
+    block = max(1, chunk//chains)       # the steps in a chunk
+
+    # the chains' states (last, second_last) are numbered last*(n+1) + second_last,
+    # and the next map is the first one whose cumulative probability in the
+    # state's row of the table is above a uniformly random number
+    cum = table.reshape(-1, n).cumsum(axis = -1)
+    cum[:, -1] = np.inf
+    state = np.full(chains, n*(n+1) + n)
+    # if the rows are all the same (an unrestricted game), the maps can be
+    # chosen for all the steps of a chunk at once
+    unrestricted = (cum == cum[0]).all()
+
+    # maps that only scale (like jump_map's) are applied as a scale factor
+    scaling = np.allclose(mats, mats[:, :1, :1]*np.eye(2))
+    scales = mats[:, :1, 0]
+
+    acc = np.empty((chains, 2))     # the accumulator points
+    acc[:] = start
+    left = npts                     # the points still to be yielded
+
+    for i0 in range(0, burn + steps, block):
+        i1 = min(i0 + block, burn + steps)
+        uniform = rng.random((i1 - i0, chains))
+        choices = np.searchsorted(cum[0], uniform, side = "right") if unrestricted else None
+        out = np.empty((i1 - i0, chains, 2))
+
+        for i in range(i1 - i0):
+            if choices is None:
+                new = (cum[state] <= uniform[i][:, None]).sum(axis = 1)
+                state = new*(n+1) + state//(n+1)
+            else:
+                new = choices[i]
+
+            if scaling:
+                acc *= scales[new]
+                acc += offsets[new]
+            else:
+                mat = mats[new]
+                acc = mat[:, :, 0]*acc[:, :1] + mat[:, :, 1]*acc[:, 1:] + offsets[new]
+            out[i] = acc
+
+        out = out[max(0, burn - i0):].reshape(-1, 2)[:left]
+        if out.size:
+            left -= len(out)
+            yield out
+
+
+# the number of points in each of the jobs that ifs_pts splits a game into
+job_size = 2**20
+
+
+# the seed sequence for the given seed (which can be a seed sequence itself,
+# or None, in which case it's drawn from the random module, so that
+# random.seed still decides the result)
+def seed_sequence(seed = None):
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(random.getrandbits(64) if seed is None else seed)
+
+
+# the multiprocessing context used for the worker pools
+# fork is preferred where it's available, since the scripts using these
+# functions are not guarded by `if __name__ == "__main__"`, and the other
+# start methods re-run the main script in every worker
+# the resource tracker is started first (on POSIX), so that the workers share
+# it, and the shared memory blocks they attach to (see render_tile in
+# mandel.py) aren't reported as leaked by trackers of their own
+def pool_context():
+    if os.name == "posix":
+        multiprocessing.resource_tracker.ensure_running()
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+# the pool of `workers` processes (all the cores, if None) that the games are
+# played on, as a context manager; if workers is a pool already (say, one
+# that's kept across several renders), it's used as is, and left running
+def worker_pool(workers = None):
+    if isinstance(workers, Executor):
+        return contextlib.nullcontext(workers)
+    return ProcessPoolExecutor(workers, mp_context = pool_context())
+
+
+# plays one of ifs_pts's jobs: npts points of the game, with it's own chains
+# and random numbers from the seed sequence seed (see ifs_chunks), in a worker
+# process; returns the points, or if shape is given, the hit counts of a
+# (width, height) histogram of them (see add_density), as (indices, counts)
+# of the pixels that were hit, indices being into the flattened histogram
+# (the histogram itself is never made, so a job only takes up as much memory
+# as it's points, however large the screen is)
+def ifs_job(maps, start, npts, table, chains, burn, seed, shape = None):
+    chunks = ifs_chunks(maps, start, npts, table, chains, burn, np.random.default_rng(seed))
+    if shape is None:
+        return np.concatenate([np.empty((0, 2))] + list(chunks))
+
+    idx = np.concatenate([np.empty(0, dtype = np.intp)] + [pixel_indices(shape, pts) for pts in chunks])
+    return np.unique(idx, return_counts = True)
+
+
+# splits a game of npts points into jobs of job_size points each, every one of
+# which has it's own chains (chains of them in all, if not None), and random
+# numbers from a stream of it's own, spawned from seed (see seed_sequence)
+# returns the jobs, as (npts, chains, seed) tuples
+def ifs_jobs(npts, chains = None, seed = None):
+    seeds = seed_sequence(seed).spawn(max(1, -(-npts//job_size)))
+    sizes = [npts//len(seeds) + (i < npts % len(seeds)) for i in range(len(seeds))]
+    return [(size, chains and max(1, chains//len(seeds)), job_seed) for size, job_seed in zip(sizes, seeds)]
+
+
+# plays the jobs of a game (see ifs_jobs) one after the other, in this
+# process, and yields their points in (N, 2) arrays of about `chunk` points
+# each, as soon as they're generated; these are the same points as ifs_pts's
+# for the same seed, in the same order
+def ifs_stream(maps, start, npts, table = None, chains = None, burn = 64, seed = None, chunk = 2**16):
+    for size, job_chains, job_seed in ifs_jobs(npts, chains, seed):
+        yield from ifs_chunks(maps, start, size, table, job_chains, burn, np.random.default_rng(job_seed), chunk)
+
+
+# the same as ifs_chunks, but returns all the points, as one (npts, 2) array
+# if density (a hit-count histogram, see add_density) is given, the points are
+# added to it a chunk at a time instead, and it's returned, so that however
+# many points there are, they never take up more memory than a chunk
+# if chunk is given, an iterator over the points, in arrays of about that many
+# points each, is returned instead (see ifs_stream)
+#
+# the game is split into jobs (see ifs_jobs), which are played on a pool of
+# `workers` processes (all the cores if None, or in this process if 1, or on
+# workers itself, if it's a pool, see worker_pool), and put together in order,
+# so the same seed gives the same points, however many workers there are
+def ifs_pts(maps, start, npts, table = None, chains = None, burn = 64, density = None, seed = None, workers = None, chunk = None):
+    if chunk is not None:
+        return ifs_stream(maps, start, npts, table, chains, burn, seed, chunk)
+
+    jobs = ifs_jobs(npts, chains, seed)
+    out = np.empty((npts, 2)) if density is None else None
+    done = 0
+
+    # played in this process, the jobs write straight into the output
+    if workers == 1 or len(jobs) == 1:
+        for size, job_chains, job_seed in jobs:
+            for pts in ifs_chunks(maps, start, size, table, job_chains, burn, np.random.default_rng(job_seed)):
+                if density is not None:
+                    add_density(density, pts)
+                else:
+                    out[done:done + len(pts)] = pts
+                    done += len(pts)
+        return out if density is None else density
+
+    # the jobs' results are dropped as soon as they're put in the output, so
+    # that they don't pile up until the last one is done
+    shape = None if density is None else density.shape
+    with worker_pool(workers) as pool:
+        futures = collections.deque(pool.submit(ifs_job, maps, start, size, table, job_chains, burn, job_seed, shape)
+                                    for size, job_chains, job_seed in jobs)
+        while futures:
+            future = futures.popleft()
+            if density is not None:
+                hit, counts = future.result()
+                density.reshape(-1)[hit] += counts.astype(density.dtype)
+            else:
+                pts = future.result()
+                out[done:done + len(pts)] = pts
+                done += len(pts)
+
+    return out if density is None else density
+
+
+# adds the points pts (an (N, 2) array, or a PointCloud) to density, a (width, height) array
+# counting the number of points that land on every pixel of the screen, with
+# the points' coordinates turned into pixels the same way plot_pts does it
+# (integer coordinates, with the y-coordinate flipped); points off the screen
+# aren't counted
+# when there are at least as many points as pixels, they're counted up for
+# every pixel at once (np.bincount), else only for the pixels they land on
+def add_density(density, pts):
+    idx = pixel_indices(density.shape, pts)
+    flat = density.reshape(-1)
+    if idx.size >= flat.size:
+        flat += np.bincount(idx, minlength = flat.size).astype(density.dtype)
+    else:
+        hit, counts = np.unique(idx, return_counts = True)
+        flat[hit] += counts.astype(density.dtype)
+
+
+# the pixels of a (width, height) screen that the points pts land on (see
+# add_density), as indices into the flattened (width, height) array, one for
+# every point on the screen
+def pixel_indices(shape, pts):
+    width, height = shape
+    x, y = screen_pixels(pts, height)
+    on_screen = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    return x[on_screen]*height + y[on_screen]
+
+
+# a cloud of points, kept as a list of contiguous (N, 2) arrays of their
+# coordinates ("segments"), along with an optional scalar for every point (such
+# as it's k-factor), kept in (N,) arrays next to them
+# joining clouds (with + or PointCloud.concat) joins their lists of segments,
+# so no points are copied, slicing a cloud gives views into it's segments, and
+# np.asarray(cloud) is the points' array itself when there's only one segment
+# iterating over a cloud gives it's points as [x, y] pairs, so that it can be
+# plotted just like a list of points
+class PointCloud:
+    def __init__(self, pts = (), values = None, dtype = np.float64):
+        pts = np.asarray(pts, dtype = dtype).reshape(-1, 2)
+        if values is not None:
+            values = np.asarray(values).reshape(-1)
+            if len(values) != len(pts):
+                raise ValueError("a point cloud needs exactly one value for every point")
+        self.segments = [(pts, values)] if len(pts) else []
+        self.has_values = values is not None
+
+    # a cloud made up of the given segments, as is (see concat)
+    @classmethod
+    def from_segments(cls, segments, has_values):
+        cloud = cls()
+        cloud.segments = [(pts, values) for pts, values in segments if len(pts)]
+        cloud.has_values = has_values
+        return cloud
+
+    # a cloud of the (N, 2) arrays in chunks (say, the chunks of a generator,
+    # see ifs_stream), each of them kept as a segment, without being copied
+    @classmethod
+    def from_chunks(cls, chunks, dtype = np.float64):
+        return cls.from_segments([(np.asarray(pts, dtype = dtype), None) for pts in chunks], False)
+
+    # joins clouds, without copying any of their points; either all of them,
+    # or none of them, can have values
+    @classmethod
+    def concat(cls, clouds):
+        clouds = [cloud if isinstance(cloud, PointCloud) else PointCloud(cloud) for cloud in clouds]
+        has_values = [cloud.has_values for cloud in clouds if len(cloud)]
+        if any(has_values) and not all(has_values):
+            raise ValueError("can't join point clouds with and without values")
+        return cls.from_segments([segment for cloud in clouds for segment in cloud.segments], any(has_values))
+
+    def __add__(self, other):
+        return PointCloud.concat([self, other])
+
+    def __len__(self):
+        return sum(len(pts) for pts, values in self.segments)
+
+    # the cloud's segments, as (pts, values) pairs, values being None if the
+    # cloud has no values
+    def chunks(self):
+        return iter(self.segments)
+
+    def __iter__(self):
+        for pts, values in self.segments:
+            yield from pts.tolist()
+
+    # a point, as an (x, y) tuple, or a slice of the cloud (views into it's
+    # segments, for slices with a step of 1)
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return PointCloud(self.xy[key], None if not self.has_values else self.values[key])
+            segments = []
+            offset = 0
+            for pts, values in self.segments:
+                i0, i1 = max(start - offset, 0), min(stop - offset, len(pts))
+                if i0 < i1:
+                    segments.append((pts[i0:i1], None if values is None else values[i0:i1]))
+                offset += len(pts)
+            return PointCloud.from_segments(segments, self.has_values)
+
+        index = key + len(self) if key < 0 else key
+        for pts, values in self.segments:
+            if 0 <= index < len(pts):
+                return tuple(pts[index].tolist())
+            index -= len(pts)
+        raise IndexError("point cloud index out of range")
+
+    # the points' coordinates, as one (N, 2) array (copied together from the
+    # segments if there's more than one of them)
+    @property
+    def xy(self):
+        if len(self.segments) == 1:
+            return self.segments[0][0]
+        return np.concatenate([pts for pts, values in self.segments] or [np.empty((0, 2))])
+
+    # the points' values, as one (N,) array (or None), like xy
+    @property
+    def values(self):
+        if not self.has_values:
+            return None
+        if len(self.segments) == 1:
+            return self.segments[0][1]
+        return np.concatenate([values for pts, values in self.segments] or [np.empty(0)])
+
+    def __array__(self, dtype = None, copy = None):
+        xy = self.xy
+        return xy if dtype is None else xy.astype(dtype, copy = bool(copy))
+
+    # the memory taken up by the points and their values, in bytes
+    @property
+    def nbytes(self):
+        return sum(pts.nbytes + (0 if values is None else values.nbytes) for pts, values in self.segments)
+
+
+# a point cloud of the regular grid with abscissae xs and ordinates ys, with
+# the (xs.size, ys.size) array values as it's values (a view of it, if it can
+# be), kept as the grid's two axes rather than as an (N, 2) array of it's
+# points: chunks() works the points out a block of abscissae at a time, about
+# `chunk` points at once, so only the values are held for the whole grid
+# the rest of PointCloud's methods see the grid as a single segment, with all
+# of it's points worked out at once
+class GridCloud(PointCloud):
+    def __init__(self, xs, ys, values = None, chunk = 65536):
+        self.xs = np.asarray(xs, dtype = np.float64).reshape(-1)
+        self.ys = np.asarray(ys, dtype = np.float64).reshape(-1)
+        if values is not None:
+            values = np.ravel(values)
+            if len(values) != self.xs.size*self.ys.size:
+                raise ValueError("a point cloud needs exactly one value for every point")
+        self.grid_values = values
+        self.has_values = values is not None
+        self.rows = max(1, chunk//max(self.ys.size, 1))     # abscissae per chunk
+
+    # the points of the grid's abscissae xs[i0:i1], as an (N, 2) array
+    def grid_pts(self, i0, i1):
+        pts = np.empty((i1 - i0, self.ys.size, 2))
+        pts[:, :, 0] = self.xs[i0:i1, None]
+        pts[:, :, 1] = self.ys
+        return pts.reshape(-1, 2)
+
+    # the grid's values for the abscissae xs[i0:i1] (or None)
+    def grid_block_values(self, i0, i1):
+        return None if self.grid_values is None else self.grid_values[i0*self.ys.size:i1*self.ys.size]
+
+    @property
+    def segments(self):
+        return [(self.grid_pts(0, self.xs.size), self.grid_block_values(0, self.xs.size))] if len(self) else []
+
+    def __len__(self):
+        return self.xs.size*self.ys.size
+
+    def chunks(self):
+        for i0 in range(0, self.xs.size if self.ys.size else 0, self.rows):
+            i1 = min(i0 + self.rows, self.xs.size)
+            yield (self.grid_pts(i0, i1), self.grid_block_values(i0, i1))
+
+    def __iter__(self):
+        for pts, values in self.chunks():
+            yield from pts.tolist()
+
+    @property
+    def nbytes(self):
+        return self.xs.nbytes + self.ys.nbytes + (0 if self.grid_values is None else self.grid_values.nbytes)
+
+
+# the pixels that the points pts (an (N, 2) array, or a PointCloud) land on,
+# on a screen `height` pixels high, as the arrays (x, y): integer coordinates,
+# with the y-coordinate flipped, the same way plot_pts does it
+def screen_pixels(pts, height):
+    pts = np.asarray(pts).reshape(-1, 2)
+    return (pts[:, 0].astype(np.intp), height - pts[:, 1].astype(np.intp))
+
+
+# the colors that color_func gives the pixels (x, y), as an (N, 3) array, with
+# color_func being called with an (x, y) tuple, like in plot_pts, but only once
+# for every distinct pixel, however many of the points land on it (or, if it
+# has an array version, such as circ_gradient's, that's called on all of them)
+def pixel_colors(color_func, x, y):
+    if hasattr(color_func, "vectorized"):
+        return color_func.vectorized(x, y)
+    if x.size == 0:
+        return np.empty((0, 3))
+    x0, y0 = x.min(), y.min()
+    rows = int(y.max() - y0) + 1
+    keys, first, inverse = np.unique((x - x0).astype(np.int64)*rows + (y - y0), return_index = True, return_inverse = True)
+    cols = np.array([color_func(pt) for pt in zip(x[first].tolist(), y[first].tolist())], dtype = np.float64).reshape(-1, 3)
+    return cols[inverse.reshape(-1)]
+
+
+# the colors that color_func gives the values ks (say, k-factors), as an array
+# of ks's shape, with an RGB triple in place of every value; color_func is
+# only called once for every distinct value (or, if it has an array version,
+# such as a linear gradient's lookup table, see gradient_lut in
+# snowmandelbrot/utils.py, that's called on all of them)
+def value_colors(color_func, ks):
+    if hasattr(color_func, "vectorized"):
+        return color_func.vectorized(ks)
+    ks = np.asarray(ks)
+    values, inverse = np.unique(ks, return_inverse = True)
+    cols = np.array([color_func(k) for k in values.tolist()], dtype = np.float64).reshape(-1, 3)
+    return cols[inverse.reshape(-1)].reshape(ks.shape + (3,))
+
+
+# lights up the pixels (x, y) of surface (integer arrays) all at once, pixel i
+# with the color cols[i] (an (N, 3) array, or a single color for all of them)
+# pixels off the surface are skipped, and a pixel that's given more than once
+# keeps the last of it's colors, just as if set_at were called for each of them
+# in turn (fractional colors are truncated, as set_at does)
+# on a surface with per-pixel alpha, the pixels lit up are made opaque as well
+# (see layer_surface)
+def blit_pixels(surface, x, y, cols):
+    width, height = surface.get_size()
+    cols = np.broadcast_to(cols, (len(x), 3))
+    on_screen = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    x, y, cols = x[on_screen], y[on_screen], cols[on_screen]
+
+    # the last time every pixel is given
+    last = x.size - 1 - np.unique((x*height + y)[::-1], return_index = True)[1]
+    pixels = pygame.surfarray.pixels3d(surface)
+    pixels[x[last], y[last]] = cols[last]
+    del pixels                  # unlocking the surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        alpha = pygame.surfarray.pixels_alpha(surface)
+        alpha[x[last], y[last]] = 255
+        del alpha
+
+
+# draws the (w, h, 3) array of colors cols onto surface, with it's top left
+# corner at the pixel pos (fractional colors are truncated, as set_at does)
+# on a surface with per-pixel alpha, they're made opaque as well, like blit_pixels
+def blit_colors(surface, cols, pos = (0, 0)):
+    x0, y0 = pos
+    pixels = pygame.surfarray.pixels3d(surface)
+    pixels[x0:x0 + cols.shape[0], y0:y0 + cols.shape[1]] = cols
+    del pixels
+    if surface.get_flags() & pygame.SRCALPHA:
+        alpha = pygame.surfarray.pixels_alpha(surface)
+        alpha[x0:x0 + cols.shape[0], y0:y0 + cols.shape[1]] = 255
+        del alpha
+
+
+# plot points inside pts_list, by lighting up pixels at
+# those coordinates (all at once, see blit_pixels). color_func
+# decides the color based on the points' coordinates
+# the points are drawn onto surface, the display's surface if it's None, with
+# the y-coordinate flipped by it's height
+def plot_pts(pts_list, color_func = lambda pt : (255,255,255), surface = None):
+    if surface is None:
+        surface = pygame.display.get_surface()
+    x, y = screen_pixels(pts_list, surface.get_height())      # integer coordinates and y-coordinate flipping
+    blit_pixels(surface, x, y, pixel_colors(color_func, x, y))
+
+
+# plot points that come in chunks (see the chunk parameter of the generators),
+# each chunk as soon as it's generated, so that only a chunk's worth of points
+# is held at once
+def plot_chunks(chunks, color_func = lambda pt : (255,255,255), surface = None):
+    for pts_list in chunks:
+        plot_pts(pts_list, color_func, surface)
+
+
+# a layer drawn on it's own: a transparent surface of the given size, with
+# per-pixel alpha, on which blit_pixels and blit_colors make the pixels they
+# light up opaque, so that it can be laid over other layers later on (see
+# overlay_pixels), with only the pixels drawn on it covering them
+def layer_surface(size):
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    surface.fill((0, 0, 0, 0))
+    return surface
+
+
+# the pixels drawn on the layer surface (see layer_surface), as the arrays
+# (rgb, drawn): a (w, h, 3) array of their colors, and a (w, h) boolean mask
+def drawn_pixels(surface):
+    return (pygame.surfarray.array3d(surface), pygame.surfarray.array_alpha(surface) > 0)
+
+
+# lays the pixels (rgb, drawn) of a layer (see drawn_pixels) over surface:
+# the pixels drawn on the layer replace those of surface, and the rest are
+# left as they are, so laying layers over one another in order gives exactly
+# what drawing them on the same surface in that order would
+def overlay_pixels(surface, rgb, drawn):
+    pixels = pygame.surfarray.pixels3d(surface)
+    pixels[drawn] = rgb[drawn]
+    del pixels
+
+
+# plays the chaos game with the points `vertices`: the accumulator point starts
+# off at `start`, and then repeatedly jumps `ratio` of the way towards one of
+# the vertices, chosen at random according to rule (see transition_table);
+# returns npts of the points visited, as an (npts, 2) array, or adds them to
+# density, or yields them in chunks (see ifs_pts, for the other parameters)
+def chaos_game(vertices, ratio, start, npts, rule = None, chains = None, burn = 64, density = None, seed = None, workers = None, chunk = None):
+    maps = [jump_map(vertex, ratio) for vertex in vertices]
+    return ifs_pts(maps, start, npts, transition_table(len(maps), rule), chains, burn, density, seed, workers, chunk)
+
+
+# generates points for a Sierpinski triangle, using chaos game,
+# with it's centroid at (x0, y0), side length being slen, and
+# number of points being npts
+# if density is given, the points are added to it instead, and if chunk is,
+# they're yielded in arrays of about that many points, as they're generated;
+# seed and workers decide the random numbers and the processes used (see ifs_pts)
+def gen_triangle_pts(x0, y0, slen, npts, density = None, seed = None, workers = None, chunk = None):
+    inradius = 0.5*slen/(3**0.5)            # the triangle's inradius
+
+    # p1, p2, p3 -> vertices of the triangle
+    p1 = (x0 - slen/2, y0 - inradius)
+    p2 = (x0 + slen/2, y0 - inradius)
+    p3 = (x0, y0 + 2*inradius)
+    # points for the accumulator to use to jump
+    pts_list = [p1, p2, p3]
+
+    # the accumulator starts off at a random point in the incircle (or at the
+    # centroid, if seeded), and jumps halfway towards a random vertex every time
+    start = rand_circ(x0, y0, inradius) if seed is None else (x0, y0)
+    return chaos_game(pts_list, 1/2, start, npts, density = density, seed = seed, workers = workers, chunk = chunk)
+
+
+# the restriction of the star's chaos game (see transition_table): if the last
+# two chosen vertices were the same, the new vertex can't be a neighbour of them
+def star_rule(last, second_last):
+    if last == second_last and last is not None:
+        return remove_neighbours(5, last)
+    return range(5)
+
+
+# generates points for a star-like, restricted chaos game based fractal,
+# with it's centroid at (x0, y0), the pentagon's side length being slen,
+# it's angular offset being angle, and the number of points being npts
+# if density is given, the points are added to it instead, and if chunk is,
+# they're yielded in arrays of about that many points, as they're generated;
+# seed and workers decide the random numbers and the processes used (see ifs_pts)
+def gen_star_pts(x0, y0, slen, npts, angle = 0, density = None, seed = None, workers = None, chunk = None):
+    # inradius and circumradius of the pentagon
+    inradius = 0.5*slen*math.tan(pi/5)
+    circum_radius = 0.5*slen/math.sin(pi/5)
+
+    # p1 through p5 -> the pentagon's vertices
+    p1 = polar_sum((x0, y0), circum_radius, pi/10 + angle)
+    p2 = polar_sum((x0, y0), circum_radius, pi/10 + 2*pi/5 + angle)
+    p3 = polar_sum((x0, y0), circum_radius, pi/10 + 4*pi/5 + angle)
+    p4 = polar_sum((x0, y0), circum_radius, pi/10 + 6*pi/5 + angle)
+    p5 = polar_sum((x0, y0), circum_radius, pi/10 + 8*pi/5 + angle)
+    
+    # points for the accumulator to use to jump
+    pts_list = [p1, p2, p3, p4, p5]
+
+    # the accumulator point starts off at a random point in the incircle (or at
+    # the centroid, if seeded), and jumps halfway towards a vertex chosen
+    # according to star_rule every time
+    start = rand_circ(x0, y0, inradius) if seed is None else (x0, y0)
+    return chaos_game(pts_list, 1/2, start, npts, star_rule, density = density, seed = seed, workers = workers, chunk = chunk)
+
+
+# generates points for a Sierpinski Christmas tree, which consists
+# of `levels` Sierpinski triangles, stacked atop one another, with the
+# bottom-most's centroid being (x0, y0) and the number of points in each
+# of the triangles being npts
+# the triangles' points are returned as a PointCloud, without being copied
+# together; if density is given, the points are added to it instead, and if chunk is,
+# they're yielded in arrays of about that many points, as they're generated;
+# seed and workers decide the random numbers and the processes used (see ifs_pts)
+def gen_tree_pts(x0, y0, slen, levels, npts, density = None, seed = None, workers = None, chunk = None):
+    out_pts = [np.empty((0, 2))]
+    delta_y = 0.125*slen*(3**0.5)       # the height delta between successive levels
+    seeds = seed_sequence(seed).spawn(levels)   # one for every triangle
+
+    # streamed, the triangles' chunks follow one another
+    if chunk is not None:
+        return (pts for i in range(levels)
+                for pts in gen_triangle_pts(x0, y0 + i*delta_y, slen, npts, seed = seeds[i], chunk = chunk))
+
+    # updating the output points with points of the triangles
+    for i in range(levels):
+        y = y0 + i*delta_y
+        out_pts.append(gen_triangle_pts(x0, y, slen, npts, density, seeds[i], workers))
+
+    if density is not None:
+        return density
+    return PointCloud.concat(out_pts)
+
+
+# generating points for a Sierpinski carpet, using chaos game
+# (x0, y0) is the centre of the carpet, l and w are it's length and
+# and width, and npts are the number of points inside it
+# if density is given, the points are added to it instead, and if chunk is,
+# they're yielded in arrays of about that many points, as they're generated;
+# seed and workers decide the random numbers and the processes used (see ifs_pts)
+def gen_carpet_pts(x0, y0, l, w, npts, density = None, seed = None, workers = None, chunk = None):
+    # p1 through p4 -> vertices of the square
+    # p5 through p8 -> midpoints of edges of the square
+    p1 = (x0 - l/2, y0 + w/2)
+    p2 = (x0 + l/2, y0 + w/2)
+    p3 = (x0 + l/2, y0 - w/2)
+    p4 = (x0 - l/2, y0 - w/2)
+    p5 = midpoint_2d(p1, p2)
+    p6 = midpoint_2d(p2, p3)
+    p7 = midpoint_2d(p3, p4)
+    p8 = midpoint_2d(p4, p1)
+    # points for the accumulator to use to jump
+    pts_list = [p1, p2, p3, p4, p5, p6, p7, p8]
+
+    # the accumulator starts off at a random point in the rectangle (or at it's
+    # centre, if seeded), and jumps 2/3 of the way towards a random vertex or
+    # edge midpoint every time
+    start = rand_rect(*p4, l, w) if seed is None else (x0, y0)
+    return chaos_game(pts_list, 2/3, start, npts, density = density, seed = seed, workers = workers, chunk = chunk)
+
+
+# generates points for a Vicsek fractal, with (x0, y0) as the centre,
+# slen being the square's side length, angle being it's angular offset
+# and npts being the number of points inside it
+# if density is given, the points are added to it instead, and if chunk is,
+# they're yielded in arrays of about that many points, as they're generated;
+# seed and workers decide the random numbers and the processes used (see ifs_pts)
+def gen_vicsek_pts(x0, y0, slen, angle, npts, density = None, seed = None, workers = None, chunk = None):
+    # inradius and circumradius of the square
+    inradius = slen/2
+    circum_radius = slen/(2**0.5)
+
+    # the square's vertices and centroid
+    p1 = polar_sum((x0, y0), circum_radius, pi/4 + angle)
+    p2 = polar_sum((x0, y0), circum_radius, 3*pi/4 + angle)
+    p3 = polar_sum((x0, y0), circum_radius, 5*pi/4 + angle)
+    p4 = polar_sum((x0, y0), circum_radius, 7*pi/4 + angle)
+    p5 = midpoint_2d(p1, p3)
+    # points for the accumulator to use to jump
+    pts_list = [p1, p2, p3, p4, p5]
+
+    # the accumulator starts off at a random point in the incircle (or at the
+    # centre, if seeded), and jumps 2/3 of the way towards a random vertex or
+    # the centroid every time
+    start = rand_circ(x0, y0, inradius) if seed is None else (x0, y0)
+    return chaos_game(pts_list, 2/3, start, npts, density = density, seed = seed, workers = workers, chunk = chunk)
+
+
+# the points of a Vicsek fractal of side 1, centred at the origin (see
+# gen_vicsek_pts), as a read-only (npts, 2) array, generated once for every
+# number of points (the snowflakes' resolution class, see vicsek_class) and
+# seed, and cached, so that any number of snowflakes can be made from it (see
+# gen_vicsek_instance)
+@functools.lru_cache(maxsize = 8)
+def canonical_vicsek_pts(npts, seed = None):
+    pts = gen_vicsek_pts(0, 0, 1, 0, npts, seed = seed)
+    pts.setflags(write = False)
+    return pts
+
+
+# points for a Vicsek fractal, with the same parameters as gen_vicsek_pts, but
+# made by scaling, turning and moving the cached canonical one (see
+# canonical_vicsek_pts) with one affine transform, instead of playing the
+# chaos game again (the game's attractor is moved the same way as it's vertices)
+# every instance with the same npts (and seed) has the same points, up to the transform
+def gen_vicsek_instance(x0, y0, slen, angle, npts, seed = None):
+    c, s = slen*math.cos(angle), slen*math.sin(angle)
+    return canonical_vicsek_pts(npts, seed) @ np.array([[c, s], [-s, c]]) + (x0, y0)
+
+
+# the resolution class of a snowflake of side slen (see gen_vicsek_instance),
+# when one of side max_slen gets npts points: the number of points that keeps
+# about as many of them on each of it's pixels (the number of pixels a Vicsek
+# fractal covers growing as it's side to the power log 5/log 3, it's dimension),
+# rounded up to a power of 2, so that only a few canonical fractals are needed
+def vicsek_class(npts, slen, max_slen):
+    n = npts*(slen/max_slen)**(math.log(5)/math.log(3))
+    return min(npts, 2**math.ceil(math.log2(max(n, 1))))
@@ -4,7 +4,7 @@ import sys
 sys.path.insert(1, sys.path[0] + "/../..")
 
 import pygame
-from anarchy import *
+from utils import *
 
 # pygame initialization
 pygame.init()
@@ -15,15 +15,6 @@ pygame.display.set_caption("Vicsek Fractal")
 surf.fill((0,0,0))          # a black background
 
 
-# plot points inside pts_list, by lighting up pixels at
-# those coordinates. color_func decides the color based on
-# the points' coordinates
-def plot_pts(pts_list, color_func = lambda pt : (255,255,255), surface = surf):
-    for pt in pts_list:
-        pt = (int(pt[0]), height - int(pt[1]))      # integer coordinates and y-coordinate flipping
-        surface.set_at(pt, color_func(pt))
-
-
 # points for the Vicsek fractal and the color function for it
 vicsek_pts = gen_vicsek_pts(width/2, height/2, 800, 0, 500000)
 col_func = circ_gradient(width/2, height/2, (white, cyan), 750)
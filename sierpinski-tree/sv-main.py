@@ -5,26 +5,17 @@ Warning: This might take a LOT of time
 """
 
 import pygame
-from anarchy import *
+from utils import *
 
 
-# pygame initialization
-pygame.init()
 # 4K resolution
 width = 3840
 height = 2160
-surf = pygame.display.set_mode((width, height))
-pygame.display.set_caption("Sierpinski Tree 4K")
+# the image is only saved, never shown, so it's drawn on an offscreen surface,
+# without initializing pygame's display (or needing one at all)
+surf = pygame.Surface((width, height))
 surf.fill((0,0,0))      # black background
-
-
-# plot points inside pts_list, by lighting up pixels at
-# those coordinates. color_func decides the color based on
-# the points' coordinates
-def plot_pts(pts_list, color_func = lambda pt : (255,255,255), surface = surf):
-    for pt in pts_list:
-        pt = (int(pt[0]), height - int(pt[1]))      # integer coordinates and y-coordinate flipping
-        surface.set_at(pt, color_func(pt))
+chunk_size = 65536          # points per chunk, for the generators (see plot_chunks)
 
 
 # a Christmas-themed color function used for the tree
@@ -32,8 +23,8 @@ chris_col_func = circ_gradient(width/2, height/2, ((255,50,50), (0,200,0), (255,
 
 # generating the leaves and trunk, 60,00,000 points for the leaves,
 # and 7,50,000 for the trunk
-leaves_pts = gen_tree_pts(width/2, height/2 - 342, 1200, 3, 2000000)
-trunk_pts = gen_carpet_pts(width/2, height/2 - 900, 420, 420, 750000)
+leaves_pts = gen_tree_pts(width/2, height/2 - 342, 1200, 3, 2000000, chunk = chunk_size)
+trunk_pts = gen_carpet_pts(width/2, height/2 - 900, 420, 420, 750000, chunk = chunk_size)
 
 # lists to store the snowflakes and their color functions
 snowflakes = []
@@ -53,18 +44,19 @@ for i in range(25):
     initial_col = ratio_div_3d(cyan, blue, 0.5 + 0.5*random.random())
     terminal_col = ratio_div_3d(cyan, blue, 0.1 + 0.4*random.random())
 
-    # updating the lists
-    snowflakes.append(gen_vicsek_pts(x, y, size, angle, 100000))
+    # updating the lists (every snowflake is the same, cached Vicsek
+    # fractal, scaled, turned and moved, see gen_vicsek_instance in common.py)
+    snowflakes.append(gen_vicsek_instance(x, y, size, angle, vicsek_class(100000, size, 180)))
     snowflakes_colfuncs.append(radial_gradient(x, height - y, (initial_col, terminal_col), 0.5*size))
 
 
 # plotting the snowflakes
 for snowflake, col_func in zip(snowflakes, snowflakes_colfuncs):
-    plot_pts(snowflake, col_func)
+    plot_pts(snowflake, col_func, surface = surf)
 
 # plotting the leaves and the trunk
-plot_pts(trunk_pts, lambda pt : (110,38,14))
-plot_pts(leaves_pts, chris_col_func)
+plot_chunks(trunk_pts, lambda pt : (110,38,14), surface = surf)
+plot_chunks(leaves_pts, chris_col_func, surface = surf)
 
 
 # saving the result in the current working directory
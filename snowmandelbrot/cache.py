@@ -0,0 +1,96 @@
+"""Cache
+
+A persistent on-disk cache for the Mandelbrot set's k-factor grids, so that
+re-rendering the same framing (with a different color map, say) doesn't
+repeat the whole calculation
+"""
+
+import contextlib
+import hashlib
+import os
+
+import numpy as np
+
+
+# the directory holding the cached grids, and the most space they may take
+# up in it (in bytes), after which the least recently used grids are deleted
+cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kf-cache")
+max_cache_bytes = 4*1024**3
+
+
+# a name for the k-factor grid with abscissae xs and ordinates ys, calculated
+# with the given parameters; the axes themselves are hashed (rather than the
+# viewport and delta they came from), so that grids of screen pixels are
+# told apart just as well, along with their sizes, so that where one axis ends
+# and the other begins is part of the key
+# grids calculated with adaptive iteration budgets are kept apart from the
+# others, since they can differ (slightly) from them; the budgets are only used
+# without the interior shortcuts (see k_factor_axes in mandel.py), so that's
+# what tells them apart
+def cache_key(xs, ys, max_iter, inf, strategy, adaptive = False, shortcuts = True):
+    xs = np.ascontiguousarray(xs, dtype = np.float64)
+    ys = np.ascontiguousarray(ys, dtype = np.float64)
+    h = hashlib.sha1()
+    h.update(repr((xs.size, ys.size, float(max_iter), float(inf), strategy, bool(adaptive and not shortcuts))).encode())
+    h.update(xs.tobytes())
+    h.update(ys.tobytes())
+    return h.hexdigest()
+
+
+# deletes the least recently used grids in the cache directory, until they take
+# up at most max_bytes (the file just saved, keep, is never deleted)
+def evict(directory, max_bytes, keep = None):
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(".npy"):
+            path = os.path.join(directory, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(entry[1] for entry in entries)
+    for mtime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path != keep:
+            os.remove(path)
+            total -= size
+
+
+# the k-factor grid with abscissae xs and ordinates ys, for the given
+# max_iter, inf, strategy, adaptive and shortcuts (see cache_key); if it's in
+# the cache, it's memory-mapped straight from there, else calculate() is called
+# to find it, and it's saved in the cache
+# a grid's modification time is bumped every time it's used, which is what
+# the least recently used eviction goes by
+# if show_status is True, a cache hit is printed
+def cached_k_factors(calculate, xs, ys, max_iter, inf, strategy, directory = None, max_bytes = None, show_status = False, adaptive = False, shortcuts = True):
+    directory = directory or cache_dir
+    max_bytes = max_cache_bytes if max_bytes is None else max_bytes
+    path = os.path.join(directory, cache_key(xs, ys, max_iter, inf, strategy, adaptive, shortcuts) + ".npy")
+
+    # the grid is loaded without checking for it first, since another process
+    # could evict it in between; a missing grid, or one that can't be read
+    # (say, a truncated one), is a miss, and is calculated again
+    try:
+        kfs = np.load(path, mmap_mode = "r")
+    except (FileNotFoundError, EOFError, ValueError):
+        pass
+    else:
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+        if show_status:
+            print("Mandelbrot k-factors loaded from the cache: " + path)
+        return kfs
+
+    kfs = calculate()
+
+    # saving to a temporary file first, so that an interrupted run never
+    # leaves a half-written grid in the cache
+    os.makedirs(directory, exist_ok = True)
+    temp_path = path + ".%d.tmp" % os.getpid()
+    with open(temp_path, "wb") as f:
+        np.save(f, kfs)
+    os.replace(temp_path, path)
+    evict(directory, max_bytes, keep = path)
+
+    return kfs
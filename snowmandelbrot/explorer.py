@@ -0,0 +1,173 @@
+"""explorer.py
+
+An interactive explorer for the Mandelbrot set. Drag with the mouse to pan
+around, and scroll to zoom in or out (around the mouse pointer). The view is
+split into fixed-size tiles, which are rendered by a pool of background
+processes and kept in a cache, so the window stays responsive while they
+stream in.
+"""
+
+import collections
+import decimal
+import math
+import os
+
+import numpy as np
+import pygame
+from utils import *
+from mandel import *
+
+# pygame initialization
+pygame.init()
+# the screen's resolution
+width = 1280
+height = 720
+surf = pygame.display.set_mode((width, height))
+pygame.display.set_caption("Mandelbrot Explorer")
+
+tile_size = 128             # the tiles' side length, in pixels
+base_scale = 250            # one unit on the real number line = `base_scale` pixels, at zoom level 0
+max_tiles = 1024            # the most tiles kept in the cache
+deep_level = 32             # beyond this zoom level, double precision isn't enough, and tiles are calculated with perturbation
+color_func = snow
+
+
+# the number of iterations used at a zoom level, more of them being needed
+# to bring out the details as we zoom in
+def level_iters(level):
+    return 150 + 50*max(level, 0)
+
+
+# renders the tile at (tx, ty) on zoom level `level`, where the screen's pixel
+# (px, py) at that level is the point px/s - (py/s)*1j, s being the level's
+# scale; returns the tile's colors as RGB bytes, row by row
+# past deep_level, the tile's centre is found exactly (with Decimals), and
+# the tile is calculated as offsets from it (see deep_k_factor_axes)
+# (this runs in the pool's worker processes)
+def render_explorer_tile(level, tx, ty, max_iter):
+    s = base_scale*2**level
+    if level > deep_level:
+        with decimal.localcontext() as ctx:
+            ctx.prec = int(level*math.log10(2)) + 30
+            cr = decimal.Decimal(2*tx*tile_size + tile_size)/(2*s)
+            ci = -decimal.Decimal(2*ty*tile_size + tile_size)/(2*s)
+        offsets = (np.arange(tile_size) + 0.5 - tile_size/2)/float(s)
+        # (the points no reference could resolve, with a k-factor of NaN, are
+        # drawn like the set's, see lut_colors in utils.py)
+        kfs = deep_k_factor_axes(cr, ci, offsets, -offsets, max_iter, 25)
+    else:
+        xs = (tx*tile_size + np.arange(tile_size) + 0.5)/s
+        ys = -(ty*tile_size + np.arange(tile_size)[::-1] + 0.5)/s            # increasing, for k_factor_axes
+        kfs = k_factor_axes(xs, ys, max_iter, 25, "subdivide")[:, ::-1]
+    cols = value_colors(color_func, kfs).transpose(1, 0, 2).astype(np.uint8)
+    return cols.tobytes()
+
+
+# the tiles at a zoom level that are (at least partly) visible on the screen,
+# when the screen's top left corner is at the pixel (ox, oy) of that level,
+# along with a ring of `margin` tiles around them, as (tx, ty) pairs
+def visible_tiles(ox, oy, margin = 0):
+    tx0 = ox//tile_size - margin
+    ty0 = oy//tile_size - margin
+    tx1 = (ox + width - 1)//tile_size + margin
+    ty1 = (oy + height - 1)//tile_size + margin
+    return [(tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1)]
+
+
+# a stand-in for a tile that isn't rendered yet: the part of the nearest
+# cached tile on a coarser zoom level that covers it, scaled up
+def placeholder(level, tx, ty):
+    for d in range(1, 6):
+        key = (level - d, tx >> d, ty >> d, level_iters(level - d))
+        if key in tiles:
+            part = tile_size >> d
+            rect = ((tx % (1 << d))*part, (ty % (1 << d))*part, max(part, 1), max(part, 1))
+            return pygame.transform.scale(tiles[key].subsurface(rect), (tile_size, tile_size))
+    return None
+
+
+# the view: the zoom level, and the pixel (at that level) at the screen's
+# top left corner, which starts off with -0.5 in the screen's centre
+# (the corner is kept as whole pixels, Python's integers being exact at any
+# zoom level, unlike floats)
+level = 0
+ox = round(-0.5*base_scale) - width//2
+oy = -height//2
+
+tiles = collections.OrderedDict()       # LRU cache: (level, tx, ty, max_iter) -> rendered tile
+pending = {}                            # tiles being rendered: (level, tx, ty, max_iter) -> future
+pool = ProcessPoolExecutor(mp_context = pool_context())
+in_flight = 2*(os.cpu_count() or 1) + 2  # the most tiles handed to the pool at once
+
+clock = pygame.time.Clock()
+dragging = False
+while True:
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            pool.shutdown(wait = False, cancel_futures = True)
+            pygame.quit()
+            quit()
+
+        # panning, by dragging with the left mouse button
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            dragging = True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            dragging = False
+        elif event.type == pygame.MOUSEMOTION and dragging:
+            ox -= event.rel[0]
+            oy -= event.rel[1]
+
+        # zooming around the mouse pointer, a level (twice as much) at a time
+        elif event.type == pygame.MOUSEWHEEL and event.y != 0:
+            mx, my = pygame.mouse.get_pos()
+            if event.y > 0:
+                level += 1
+                ox, oy = 2*(ox + mx) - mx, 2*(oy + my) - my
+            else:
+                level -= 1
+                ox, oy = (ox + mx)//2 - mx, (oy + my)//2 - my
+
+    max_iter = level_iters(level)
+
+    # the visible tiles come first (nearest to the screen's centre first), and
+    # then the ones around them, which are prefetched
+    centre = (ox + width//2)//tile_size, (oy + height//2)//tile_size
+    wanted = sorted(visible_tiles(ox, oy), key = lambda t : (t[0] - centre[0])**2 + (t[1] - centre[1])**2)
+    visible = set(wanted)
+    wanted += [t for t in visible_tiles(ox, oy, 1) if t not in visible]
+    wanted_keys = [(level, tx, ty, max_iter) for tx, ty in wanted]
+
+    # collecting finished tiles, and cancelling the requests for those that
+    # the view has moved away from
+    for key, future in list(pending.items()):
+        if future.done():
+            del pending[key]
+            if not future.cancelled():
+                tiles[key] = pygame.image.frombuffer(future.result(), (tile_size, tile_size), "RGB").convert()
+        elif key not in wanted_keys and future.cancel():
+            del pending[key]
+
+    # handing out new tiles to the pool
+    for key in wanted_keys:
+        if len(pending) >= in_flight:
+            break
+        if key not in tiles and key not in pending:
+            pending[key] = pool.submit(render_explorer_tile, *key)
+
+    while len(tiles) > max_tiles:
+        tiles.popitem(last = False)
+
+    # drawing the visible tiles, or stand-ins for them
+    surf.fill(black)
+    for tx, ty in wanted[:len(visible_tiles(ox, oy))]:
+        key = (level, tx, ty, max_iter)
+        tile = tiles.get(key)
+        if tile is not None:
+            tiles.move_to_end(key)
+        else:
+            tile = placeholder(level, tx, ty)
+        if tile is not None:
+            surf.blit(tile, (tx*tile_size - ox, ty*tile_size - oy))
+
+    pygame.display.update()
+    clock.tick(60)
@@ -1,10 +1,15 @@
 """main.py
 
-Running it should open a window of near-HD resolution. The image should be rendered roughly in a minute. The terminal displays a progress bar to denote how much calculation has been performed for the Mandelbrot set. Do note though that this doesn't say anything about the time taken to plot all those points.
+Running it should open a window of near-HD resolution. The Mandelbrot set is calculated in the background, and shown in passes of increasing resolution as they are done, so the window stays responsive (and can be closed) while it's being rendered.
 """
 
+import queue
+import threading
+
 import pygame
 from utils import *
+from mandel import *
+from cache import *
 
 # pygame initialization
 pygame.init()
@@ -16,103 +21,145 @@ pygame.display.set_caption("Snowmandelbrot")
 surf.fill((0,0,0))      # black background
 
 scale = 375                 # one unit on the real number line = `scale` pixels
-
-
-# this real number is equal to the number of iterations of
-# the Mandelbrot formula (z_{n+1} = z_{n}^2 + z_0), after which
-# the point z goes outside inf (i.e. |z| > inf), divided by max_iter
-# for a point that never goes outside inf, it returns 1
-def k_factor(z, max_iter, inf):
-    z0 = z
-    for i in range(int(max_iter)):
-        if abs(z) > inf:
-            return i/(max_iter-1)
-        z = z**2 + z0
-    return 1
-
-
-# returns two lists in a tuple, say (p, k), where
-# p are all the points (x, y) such that x1 <= x <= x2 and y1 <= y <= y2,
-# sampled at differences of delta
-# k is the list of the k-factors for these points, evaluated with
-# max_iter and inf as it's parameters
-# if show_status is True, the progress of these calculations is printed
-def gen_mandelbrot_pts(x1, x2, y1, y2, delta, max_iter = 100, inf = 10, show_status = False):
-    x_pts = int((x2-x1)/delta)              # no. of points along the grid's length
-    y_pts = int((y2-y1)/delta)              # no. of points along the grid's width
-    total_pts = x_pts * y_pts               # no. of total points in the grid
-    pts_list = []                           # the list p, from the comment before the function
-
-    # if show_status is set to True, display the progress
-    if show_status:
-        print("\n\n")
-        for i in range(x_pts):
-            for j in range(y_pts):
-                progress = i*y_pts + j + 1
-                print("\rMandelbrot calculation progress: " + "#"*int((progress/total_pts)*50) + "-"*int((1 - progress/total_pts)*50), end = "")
-                pts_list.append(complex(x1+i*delta, y1+j*delta))
-
-    # if show_status is False, the calculations are faster,
-    # as list comprehension is used instead of two nested for loops
+chunk_size = 65536          # points per chunk, for the chaos game generators (see plot_chunks)
+
+
+# draws a pass of the Mandelbrot set's k-factors (see render_mandelbrot_pixels)
+# onto surface; in a pass with a stride larger than 1, every calculated sample
+# is drawn as a block covering the samples that aren't calculated yet, and in
+# the final pass every pixel gets the average of color_func's colors for it's
+# n x n samples
+# this is a generator, which draws a few columns of the screen at a time, so
+# that the event loop can draw a bit of the pass in every frame
+def draw_mandel_pass(stride, kfs, n = 1, color_func = lambda r : (255,255,255), surface = surf):
+    if stride == 1:
+        cols = value_colors(color_func, group_pixel_samples(kfs, n)).mean(axis = 2)
+        for x in range(0, cols.shape[0], 64):
+            blit_colors(surface, cols[x:x + 64], (x, 0))
+            yield
     else:
-        pts_list = [complex(x1+i*delta, y1+j*delta) for i in range(x_pts) for j in range(y_pts)]
-
-    # this list is k, from the comment before the function
-    kfs_list = [k_factor(z, max_iter, inf) for z in pts_list]
-
-    # print a new line if show_status is True
-    if show_status:
-        print()
-
-    return (pts_list, kfs_list)
-
-
-# plot points inside pts_list, by lighting up pixels at
-# those coordinates. color_func decides the color based on
-# the points' coordinates
-def plot_pts(pts_list, color_func = lambda pt : (255,255,255), surface = surf):
-    for pt in pts_list:
-        pt = (int(pt[0]), height - int(pt[1]))      # integer coordinates and y-coordinate flipping
-        surface.set_at(pt, color_func(pt))
+        size = -(-stride//n)            # the blocks' size, in pixels
+        coarse = value_colors(color_func, kfs[::stride, ::stride]).tolist()
+        for j in range(len(coarse[0])):
+            for i in range(len(coarse)):
+                surface.fill(coarse[i][j], (j*stride//n, i*stride//n, size, size))
+            yield
+
+
+# mapping a point in the Cartesian plane to the screen, and back again
+# (see snowman_map in utils.py), giving the Mandelbrot set the snowman-like
+# orientation
+map_func, inverse_map_func = snowman_map(width, height, scale)
+
+
+# calculates the k-factors for every pixel on the screen by walking the pixels
+# and mapping n x n samples inside each of them back into the Cartesian plane
+# with inverse_map_func (map_func sends the real axis along the screen's
+# height and the imaginary axis along it's width, so the samples make up a grid
+# in the plane as well)
+# the samples are calculated in passes of increasing resolution (see
+# progressive_k_factors in mandel.py), each of which is put on the queue
+# `passes` as (stride, kfs) once it's done; the full-resolution pass is saved in
+# the on-disk cache, and if it's already there, it's the only pass put on passes
+# this is meant to be run on a thread of it's own, and stops early once cancel is set
+# workers should be a pool that's already running (see worker_pool in utils.py),
+# or 1, since any other value would have every pass fork a pool of it's own
+# from that thread
+# the other parameters are the same as gen_mandelbrot_pts's, and adaptive and
+# shortcuts are as in calculate_k_factors (both in mandel.py)
+def render_mandelbrot_pixels(passes, cancel, n = 1, max_iter = 100, inf = 10, strategy = "full", workers = None, show_status = False, adaptive = False, shortcuts = True):
+    xs, ys = pixel_axes(inverse_map_func, width, height, n)
+
+    def calculate():
+        for stride, kfs in progressive_k_factors(xs, ys, max_iter, inf, strategy, workers, cancel = cancel, adaptive = adaptive, shortcuts = shortcuts):
+            if stride > 1:
+                passes.put((stride, kfs.copy()))
+            if show_status:
+                print("Mandelbrot pass done: 1/%d of the samples along each axis" % stride)
+        return kfs
+
+    try:
+        passes.put((1, cached_k_factors(calculate, xs, ys, max_iter, inf, strategy, show_status = show_status, adaptive = adaptive, shortcuts = shortcuts)))
+    except Cancelled:
+        pass
+
+
+# if pixel_driven is True, the Mandelbrot set is rendered by walking the
+# screen's pixels, with supersample x supersample samples in each of them,
+# progressively on a background thread (so that the window shows up right away),
+# else the Cartesian plane is sampled and the samples are plotted
+# with shortcuts set to False and adaptive to True, the interior shortcuts (see
+# k_factors in mandel.py) give way to iteration budgets adapted tile by tile
+# (see tile_budgets)
+pixel_driven = True
+supersample = 1
+adaptive = False
+shortcuts = True
 
 
-# plot points inside pts_list, by lighting up pixels at
-# those coordinates. color_func decides the color based on
-# the k-factor inside kfs_list
-def plot_mandel_pts(pts_list, kfs_list, map_func = lambda pt : pt, color_func = lambda r : (255,255,255), surface = surf):
-    for pt, k in zip(pts_list, kfs_list):
-        x, y = map_func(pt)
-        col = color_func(k)
-        surface.set_at((int(x), int(y)), col)
-
-
-# mapping a point in the Cartesian plane to the screen,
-# this gives the Mandelbrot set the snowman-like orientation
-def map_func(pt):
-    x = pt.real
-    y = pt.imag
-    return (width/2 + scale*y, height + scale*(x-0.4))
-        
-
-# points for the mandelbrot set
-pts, ks = gen_mandelbrot_pts(-2.26666,0.4,-2.46666,2.46666,0.0022, max_iter = 250, show_status = True)
-
 # points for the cap and star atop the Snowmandelbrot
-cap_pts = gen_triangle_pts(width/2, 0.685*height, 0.225*height, 100000)
-star_pts = gen_star_pts(width/2, 0.87*height, 0.065*height, 10000, pi)
-
-# plotting all the generated points
-plot_mandel_pts(pts, ks, map_func, snow, surface=surf)
-plot_pts(cap_pts, lambda pt : (255,0,0), surface=surf)
-plot_pts(star_pts, surface=surf)
+# (generated in chunks, as they're plotted)
+cap_pts = gen_triangle_pts(width/2, 0.685*height, 0.225*height, 100000, chunk = chunk_size)
+star_pts = gen_star_pts(width/2, 0.87*height, 0.065*height, 10000, pi, chunk = chunk_size)
 
+# the Mandelbrot set is drawn on a surface of it's own, and the cap and the
+# star on an overlay (black being it's transparent color), which is blitted
+# on top of it in every frame
+mandel_surf = pygame.Surface((width, height))
+overlay = pygame.Surface((width, height))
+overlay.set_colorkey(black)
 
-# displaying the surface and keeping the display running
+# points for the mandelbrot set
+if pixel_driven:
+    passes = queue.Queue()
+    cancel = threading.Event()
+    # one pool of worker processes for all of the passes, started here (a
+    # forked pool starts all of it's processes on it's first job), since
+    # forking from the background thread could deadlock on locks held by others
+    pool = worker_pool()
+    pool.submit(int).result()
+    renderer = threading.Thread(target = render_mandelbrot_pixels, args = (passes, cancel, supersample),
+                                kwargs = {"max_iter" : 250, "strategy" : "subdivide", "workers" : pool, "adaptive" : adaptive, "shortcuts" : shortcuts}, daemon = True)
+    renderer.start()
+else:
+    for mandel_cloud in gen_mandelbrot_pts(-2.26666,0.4,-2.46666,2.46666,0.0022, max_iter = 250, strategy = "subdivide", show_status = True, chunk = 256):
+        plot_mandel_pts(mandel_cloud, map_func, snow, surface=mandel_surf)
+
+# plotting the cap and the star
+plot_chunks(cap_pts, lambda pt : (255,0,0), surface=overlay)
+plot_chunks(star_pts, surface=overlay)
+
+
+# displaying the surface and keeping the display running, while drawing the
+# passes of the Mandelbrot set as they arrive
+clock = pygame.time.Clock()
+drawing = None          # the pass being drawn (see draw_mandel_pass)
 while True:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            # stopping the Mandelbrot set's calculation, if it's still running,
+            # and it's pool
+            if pixel_driven:
+                cancel.set()
+                renderer.join(5)
+                pool.shutdown(wait = False, cancel_futures = True)
             pygame.quit()
             quit()
 
+    # picking up the latest pass, skipping the coarser ones if they're outdated
+    if pixel_driven and not passes.empty():
+        while not passes.empty():
+            stride, kfs = passes.get()
+        drawing = draw_mandel_pass(stride, kfs, supersample, snow, mandel_surf)
+
+    # drawing as much of the pass as fits in a frame
+    if drawing is not None:
+        frame_end = pygame.time.get_ticks() + 25
+        while drawing is not None and pygame.time.get_ticks() < frame_end:
+            if next(drawing, "done") == "done":
+                drawing = None
+
+    surf.blit(mandel_surf, (0, 0))
+    surf.blit(overlay, (0, 0))
     pygame.display.update()
-
+    clock.tick(60)
@@ -0,0 +1,733 @@
+"""Mandel
+
+Grouping together functions that evaluate the Mandelbrot set's escape-time
+"k-factors", working on whole NumPy arrays of points at once instead of a
+single complex number at a time
+"""
+
+import contextlib
+import decimal
+import math
+from concurrent.futures import as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+from cache import cached_k_factors
+from utils import GridCloud, worker_pool
+
+
+# this real number is equal to the number of iterations of
+# the Mandelbrot formula (z_{n+1} = z_{n}^2 + z_0), after which
+# the point z goes outside inf (i.e. |z| > inf), divided by max_iter
+# for a point that never goes outside inf, it returns 1
+# (the scalar reference version, the array functions below must agree with it)
+def k_factor(z, max_iter, inf):
+    z0 = z
+    for i in range(int(max_iter)):
+        if abs(z) > inf:
+            return i/(max_iter-1)
+        z = z**2 + z0
+    return 1
+
+
+# prints the progress bar used while the Mandelbrot set is being calculated
+def print_status(progress):
+    print("\rMandelbrot calculation progress: " + "#"*int(progress*50) + "-"*int((1 - progress)*50), end = "")
+
+
+# True for the points (cr + ci*1j) that lie inside the main cardioid or
+# the period-2 bulb of the Mandelbrot set, whose orbits never escape
+def in_cardioid_or_bulb(cr, ci):
+    ci2 = ci*ci
+    q = (cr - 0.25)**2 + ci2
+    return (q*(q + (cr - 0.25)) < 0.25*ci2) | ((cr + 1)**2 + ci2 < 0.0625)
+
+
+# adds the numbers in `counts` to the counters of the same names in stats
+# (stats is a dictionary, or None if nobody is keeping count)
+def add_stats(stats, **counts):
+    if stats is not None:
+        for name, count in counts.items():
+            stats[name] = stats.get(name, 0) + int(count)
+
+
+# k-factors for a whole array of points, given by their real parts cr and
+# imaginary parts ci; the result has the same shape as cr
+# all points are iterated in lock-step, and the ones that have gone outside
+# inf are dropped from the working arrays, so every step only costs as much
+# as the number of points that are still iterating
+#
+# if shortcuts is True, points that are known to never escape are dropped
+# early as well (with a k-factor of 1), which doesn't change the result:
+#   - points inside the main cardioid and the period-2 bulb are never
+#     iterated at all (orbits of points in the set stay within |z| <= 2,
+#     so this is only done when inf >= 2)
+#   - every point's orbit is compared against a saved value of it, which is
+#     renewed at steps 1, 2, 4, 8, ... (Brent's cycle detection); once the
+#     orbit exactly repeats itself, it can never escape
+#
+# if budget is given (and less than max_iter), the points are only iterated
+# budget times, and the ones that haven't escaped by then are taken to be in
+# the set, with a k-factor of 1 (the other k-factors are still fractions of
+# max_iter, and so are unchanged)
+#
+# if stats is a dictionary, the number of iterations performed and saved by
+# the shortcuts are added to it, as stats["iterations"] and stats["saved"],
+# along with the iterations cut off by the budget, as stats["cut"] (i.e. the
+# most iterations the points still iterating at the end could have needed)
+# if show_status is True, the progress (in iterations) is printed
+def k_factors(cr, ci, max_iter = 100, inf = 10, shortcuts = True, stats = None, show_status = False, budget = None):
+    cr = np.asarray(cr, dtype = np.float64)
+    ci = np.asarray(ci, dtype = np.float64)
+    shape = cr.shape
+    cr = cr.ravel()
+    ci = ci.ravel()
+
+    kfs = np.ones(cr.size)          # points that never escape keep a k-factor of 1
+    idx = np.arange(cr.size)        # indices (into kfs) of the points still iterating
+    n_iter = int(max_iter if budget is None else min(budget, max_iter))
+    iterations = 0
+    saved = 0
+
+    # the cardioid and bulb don't need to be iterated at all
+    if shortcuts and inf >= 2:
+        left = ~in_cardioid_or_bulb(cr, ci)
+        saved += (cr.size - np.count_nonzero(left))*n_iter
+        idx, cr, ci = idx[left], cr[left], ci[left]
+
+    zr = cr.copy()
+    zi = ci.copy()
+    # the saved orbit values for the cycle detection, and the next step at
+    # which they are renewed
+    sr = zr.copy()
+    si = zi.copy()
+    next_save = 1
+
+    for i in range(n_iter):
+        if show_status:
+            print_status((i+1)/n_iter)
+        if idx.size == 0:
+            break
+
+        # points that went outside inf in this step get their k-factor,
+        # and are removed from the working arrays, along with the periodic ones
+        escaped = np.hypot(zr, zi) > inf
+        done = escaped
+        if shortcuts and i > 0:
+            periodic = (zr == sr) & (zi == si)
+            saved += np.count_nonzero(periodic)*(n_iter - i)
+            done = escaped | periodic
+        if done.any():
+            kfs[idx[escaped]] = i/(max_iter-1)
+            left = ~done
+            idx, zr, zi, cr, ci = idx[left], zr[left], zi[left], cr[left], ci[left]
+            if shortcuts:
+                sr, si = sr[left], si[left]
+        if shortcuts and i == next_save:
+            sr, si = zr.copy(), zi.copy()
+            next_save *= 2
+
+        # z = z**2 + z0, written out the same way Python's complex numbers
+        # evaluate it, so that the results are identical to k_factor's
+        zr, zi = zr*zr - zi*zi + cr, zr*zi + zi*zr + ci
+        iterations += idx.size
+
+    if show_status:
+        print_status(1)
+        print()
+
+    add_stats(stats, iterations = iterations, saved = saved, cut = idx.size*(int(max_iter) - n_iter))
+    return kfs.reshape(shape)
+
+
+# the real and imaginary parts along the axes of the grid used by
+# gen_mandelbrot_pts, i.e. the abscissae x1 + i*delta and the ordinates
+# y1 + j*delta, as two 1D arrays
+# if aligned is True, the ordinates are moved by less than delta/2, to the
+# nearest multiples of delta, so that the grid's rows above and below the
+# real axis are exact mirror images of each other (see mirrored_rows)
+def grid_axes(x1, x2, y1, y2, delta, aligned = False):
+    x_pts = int((x2-x1)/delta)              # no. of points along the grid's length
+    y_pts = int((y2-y1)/delta)              # no. of points along the grid's width
+    if aligned:
+        return (x1 + np.arange(x_pts)*delta, (round(y1/delta) + np.arange(y_pts))*delta)
+    return (x1 + np.arange(x_pts)*delta, y1 + np.arange(y_pts)*delta)
+
+
+# real and imaginary parts of the grid of points used by gen_mandelbrot_pts,
+# i.e. the points x1 + i*delta + (y1 + j*delta)*1j, with i along the
+# first axis and j along the second, as two (x_pts, y_pts) arrays
+def grid_pts(x1, x2, y1, y2, delta, aligned = False):
+    xs, ys = grid_axes(x1, x2, y1, y2, delta, aligned)
+    return np.meshgrid(xs, ys, indexing = "ij")
+
+
+# concatenation of np.arange(a, b) for every (a, b) in zip(starts, stops),
+# along with the offsets at which each of those ranges begins in it
+def concat_ranges(starts, stops):
+    lengths = stops - starts
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return (np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths), offsets)
+
+
+# indices (ii, jj) of all the points inside the rectangles i0 <= i < i1 and
+# j0 <= j < j1 (all arrays), along with the rectangle each of them is in
+def rect_pts(i0, i1, j0, j1):
+    i1 = np.maximum(i0, i1)
+    j1 = np.maximum(j0, j1)
+    rects = np.repeat(np.arange(i0.size), i1 - i0)          # one for each row of each rectangle
+    ii = concat_ranges(i0, i1)[0]
+    widths = (j1 - j0)[rects]
+    jj = concat_ranges(j0[rects], j1[rects])[0]
+    return (np.repeat(ii, widths), jj, np.repeat(rects, widths))
+
+
+# k-factors for the grid with abscissae xs and ordinates ys, found by
+# Mariani-Silver subdivision instead of iterating every single point:
+# the grid is split into max_size x max_size rectangles, and for each of them
+# only the points on it's border are calculated; if they all have the same
+# k-factor, the whole rectangle is filled with it (the Mandelbrot set is
+# connected, so nothing can hide inside such a border), else the rectangle
+# is split into four and the same is done for each of them, until they are
+# smaller than min_size, where all the points are simply calculated
+# all the rectangles of a level are handled together, with one call to
+# k_factors for all of their borders, and borders shared by neighbouring
+# rectangles are only calculated once
+# the number of filled points is added to stats["filled"] (see k_factors,
+# which budget is passed on to as well)
+def k_factors_subdivided(xs, ys, max_iter = 100, inf = 10, shortcuts = True, stats = None, max_size = 64, min_size = 8, budget = None):
+    nx, ny = xs.size, ys.size
+    kfs = np.zeros((nx, ny))
+    known = np.zeros((nx, ny), dtype = bool)        # the points calculated (or filled) so far
+    filled = 0
+
+    # calculates the k-factors of the points (ii, jj) that aren't known yet
+    # (each of them only once, even if it's repeated in ii and jj)
+    def calculate(ii, jj):
+        flat = ii*ny + jj
+        flat = np.unique(flat[~known.ravel()[flat]])
+        ii, jj = flat//ny, flat % ny
+        kfs[ii, jj] = k_factors(xs[ii], ys[jj], max_iter, inf, shortcuts, stats, budget = budget)
+        known[ii, jj] = True
+
+    # the rectangles i0 <= i < i1, j0 <= j < j1 of the current level
+    i0, i1, j0, j1 = np.array(split_tiles(nx, ny, max_size), dtype = np.int64).reshape(-1, 4).T
+    while i0.size:
+        # the four edges of every rectangle, as the indices of their points,
+        # along with the offsets at which each rectangle's edge begins
+        jj, j_offsets = concat_ranges(j0, j1)
+        ii, i_offsets = concat_ranges(i0, i1)
+        edges = [(np.repeat(i0, j1 - j0), jj, j_offsets), (np.repeat(i1 - 1, j1 - j0), jj, j_offsets),
+                 (ii, np.repeat(j0, i1 - i0), i_offsets), (ii, np.repeat(j1 - 1, i1 - i0), i_offsets)]
+
+        # calculating the borders of all the rectangles at this level
+        calculate(np.concatenate([e[0] for e in edges]), np.concatenate([e[1] for e in edges]))
+
+        # the smallest and largest k-factor along every rectangle's border
+        lo = np.min([np.minimum.reduceat(kfs[e[0], e[1]], e[2]) for e in edges], axis = 0)
+        hi = np.max([np.maximum.reduceat(kfs[e[0], e[1]], e[2]) for e in edges], axis = 0)
+
+        # uniform borders: filling the rectangles' insides
+        uniform = lo == hi
+        ii, jj, rects = rect_pts(i0[uniform] + 1, i1[uniform] - 1, j0[uniform] + 1, j1[uniform] - 1)
+        kfs[ii, jj] = lo[uniform][rects]
+        filled += ii.size
+        known[ii, jj] = True
+
+        # rectangles too small to be split any further: calculating all of them
+        small = ~uniform & ((i1 - i0 <= min_size) | (j1 - j0 <= min_size))
+        calculate(*rect_pts(i0[small], i1[small], j0[small], j1[small])[:2])
+
+        # splitting the rest into four, with the children sharing the middle
+        # row and column, so that those are calculated only once
+        split = ~uniform & ~small
+        i0, i1, j0, j1 = i0[split], i1[split], j0[split], j1[split]
+        im = (i0 + i1)//2
+        jm = (j0 + j1)//2
+        i0, i1, j0, j1 = (np.concatenate((i0, im, i0, im)), np.concatenate((im + 1, i1, im + 1, i1)),
+                          np.concatenate((j0, j0, jm, jm)), np.concatenate((jm + 1, jm + 1, j1, j1)))
+
+    add_stats(stats, filled = filled)
+    return kfs
+
+
+# k-factors for the grid with abscissae xs and ordinates ys, found using
+# the given strategy: "full" iterates every single point, and "subdivide"
+# uses Mariani-Silver subdivision (see k_factors_subdivided)
+# budget is as in k_factors
+def axes_k_factors(xs, ys, max_iter = 100, inf = 10, strategy = "full", shortcuts = True, stats = None, budget = None):
+    if strategy == "subdivide":
+        return k_factors_subdivided(xs, ys, max_iter, inf, shortcuts, stats, budget = budget)
+    if strategy == "full":
+        cr, ci = np.meshgrid(xs, ys, indexing = "ij")
+        return k_factors(cr, ci, max_iter, inf, shortcuts, stats, budget = budget)
+    raise ValueError("unknown strategy: " + repr(strategy))
+
+
+# conjugate points (x + y*1j and x - y*1j) have mirror image orbits, and so
+# the same k-factors; this finds the rows of a grid with evenly spaced,
+# increasing ordinates ys which need to be calculated, i.e. all but the rows
+# above the real axis whose mirror image is in the grid as well
+# returns (rows, source): the indices of the rows to calculate, and for every
+# row of the grid, the index (into rows) of the row it's k-factors come from
+def mirrored_rows(ys):
+    if ys.size < 2:
+        return (np.arange(ys.size), np.arange(ys.size))
+    delta = (ys[-1] - ys[0])/(ys.size - 1)
+    mirror = np.clip(np.rint((-ys - ys[0])/delta).astype(np.int64), 0, ys.size - 1)
+    copied = (ys > 0) & (np.abs(ys[mirror] + ys) <= 1e-6*delta)
+    position = np.cumsum(~copied) - 1               # index (into rows) of every calculated row
+    return (np.nonzero(~copied)[0], np.where(copied, position[mirror], position))
+
+
+# splits the sorted indices in rows into runs of consecutive indices,
+# as (start, stop) pairs of positions in rows
+def row_runs(rows):
+    breaks = np.nonzero(np.diff(rows) != 1)[0] + 1
+    bounds = np.concatenate(([0], breaks, [rows.size]))
+    return [(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+# k-factors for the grid with abscissae xs and (evenly spaced, increasing)
+# ordinates ys, as an (xs.size, ys.size) array; strategy is as in
+# axes_k_factors, and shortcuts and stats as in k_factors
+# if mirror is True, rows that are mirror images of others about the real
+# axis are copied instead of being calculated (see mirrored_rows)
+# if adaptive is True, every tile_size x tile_size tile of the grid gets it's
+# own iteration budget, found by a coarse pass (see tile_budgets); this is only
+# done when shortcuts is False, since the shortcuts already skip the tiles
+# inside the set, and the coarse pass would only add to the work
+def k_factor_axes(xs, ys, max_iter = 100, inf = 10, strategy = "full", shortcuts = True, stats = None, mirror = True, show_status = False, adaptive = False, tile_size = 128):
+    rows, source = mirrored_rows(ys) if mirror else (np.arange(ys.size), np.arange(ys.size))
+
+    # with adaptive budgets, the grid is calculated a tile at a time, each
+    # with it's own budget (see tile_budgets)
+    if adaptive and not shortcuts:
+        kfs = np.zeros((xs.size, rows.size))
+        tiles = run_tiles(rows, xs.size, tile_size)
+        for (i0, i1, j0, j1), budget in zip(tiles, tile_budgets(xs, ys[rows], tiles, max_iter, inf, stats = stats)):
+            kfs[i0:i1, j0:j1] = axes_k_factors(xs[i0:i1], ys[rows[j0:j1]], max_iter, inf, strategy, shortcuts, stats, budget)
+    elif strategy == "full":
+        cr, ci = np.meshgrid(xs, ys[rows], indexing = "ij")
+        kfs = k_factors(cr, ci, max_iter, inf, shortcuts, stats, show_status)
+    # the other strategies work on rectangular regions of the plane, which
+    # the rows in a run of consecutive rows make up
+    else:
+        kfs = np.zeros((xs.size, rows.size))
+        for a, b in row_runs(rows):
+            kfs[:, a:b] = axes_k_factors(xs, ys[rows[a:b]], max_iter, inf, strategy, shortcuts, stats)
+
+    return kfs[:, source]
+
+
+# k-factors for all the points of the grid described in grid_pts, as an
+# (x_pts, y_pts) array; takes the same parameters as gen_mandelbrot_pts,
+# along with those of k_factor_axes
+# if mirror is True, the grid is aligned (see grid_axes), so that the rows
+# on one side of the real axis are exact mirror images of the other's
+def k_factor_grid(x1, x2, y1, y2, delta, max_iter = 100, inf = 10, strategy = "full", shortcuts = True, stats = None, mirror = True, show_status = False):
+    xs, ys = grid_axes(x1, x2, y1, y2, delta, mirror)
+    return k_factor_axes(xs, ys, max_iter, inf, strategy, shortcuts, stats, mirror, show_status)
+
+
+# raised when a calculation is stopped midway, through it's cancel event
+class Cancelled(Exception):
+    pass
+
+
+# calculates the k-factors of the tile with abscissae xs and ordinates ys,
+# and returns them along with the tile's iteration counts (see the stats of k_factors)
+def tile_k_factors(xs, ys, max_iter, inf, strategy, shortcuts, budget = None):
+    stats = {}
+    return (axes_k_factors(xs, ys, max_iter, inf, strategy, shortcuts, stats, budget), stats)
+
+
+# calculates the k-factors of the tile with abscissae xs and ordinates ys,
+# and writes them straight into the grid of the given shape, held in the shared
+# memory block called `name` (see k_factor_axes_tiled), at i0 <= i < i1 and
+# j0 <= j < j1; the block is attached to by name, so this works on any pool,
+# including one that was started before the block was made
+# returns the tile's iteration counts (see the stats of k_factors)
+def render_tile(name, shape, xs, ys, i0, i1, j0, j1, max_iter, inf, strategy, shortcuts, budget = None):
+    kfs, stats = tile_k_factors(xs, ys, max_iter, inf, strategy, shortcuts, budget)
+    shm = shared_memory.SharedMemory(name)
+    out = np.ndarray(shape, dtype = np.float64, buffer = shm.buf)
+    out[i0:i1, j0:j1] = kfs
+    del out
+    shm.close()
+    return stats
+
+
+# splits the grid into tile_size x tile_size tiles, as (i0, i1, j0, j1) tuples
+def split_tiles(x_pts, y_pts, tile_size):
+    return [(i0, min(i0 + tile_size, x_pts), j0, min(j0 + tile_size, y_pts))
+            for i0 in range(0, x_pts, tile_size) for j0 in range(0, y_pts, tile_size)]
+
+
+# splits the grid of the calculated rows (see mirrored_rows) into tiles, which
+# don't straddle the gaps between runs of consecutive rows
+def run_tiles(rows, x_pts, tile_size):
+    tiles = []
+    for a, b in row_runs(rows):
+        tiles += [(i0, i1, a + j0, a + j1) for i0, i1, j0, j1 in split_tiles(x_pts, b - a, tile_size)]
+    return tiles
+
+
+# the iteration budgets (see k_factors) of the tiles (i0, i1, j0, j1) of the
+# grid with abscissae xs and ordinates ys, as a list, going by a coarse pass
+# over every step-th point of the grid (and the last ones), which looks at the
+# samples inside each tile and in a ring around it: if all of them are in the
+# set, the tile is taken to be well inside it, and gets inside_budget*max_iter
+# iterations (the points that haven't escaped by then are taken to be in the
+# set), and every other tile gets the whole max_iter (a budget of None)
+# only tiles inside the set are capped: a tile outside it already stops as soon
+# as it's last point escapes, so a budget could only cut off it's slowest points
+# this only pays off without the interior shortcuts (see k_factors), which drop
+# the points inside the set long before any budget runs out, so with them the
+# coarse pass is pure overhead (see k_factor_axes)
+# the coarse pass's iterations are added to stats, as stats["iterations"] and
+# stats["coarse"]
+def tile_budgets(xs, ys, tiles, max_iter = 100, inf = 10, step = 16, inside_budget = 0.25, stats = None):
+    si = np.unique(np.append(np.arange(0, xs.size, step), xs.size - 1))
+    sj = np.unique(np.append(np.arange(0, ys.size, step), ys.size - 1))
+    cr, ci = np.meshgrid(xs[si], ys[sj], indexing = "ij")
+    coarse = {}
+    kfs = k_factors(cr, ci, max_iter, inf, stats = coarse)
+    add_stats(stats, iterations = coarse["iterations"], coarse = coarse["iterations"])
+
+    budgets = []
+    for i0, i1, j0, j1 in tiles:
+        a = slice(np.searchsorted(si, i0 - step), np.searchsorted(si, i1 + step))
+        b = slice(np.searchsorted(sj, j0 - step), np.searchsorted(sj, j1 + step))
+        budgets.append(int(inside_budget*max_iter) if (kfs[a, b] == 1).all() else None)
+    return budgets
+
+
+# same as k_factor_axes, but the grid is split into small tiles which are
+# calculated (each with the given strategy) on a pool of `workers` processes
+# (all the cores, if None)
+# the tiles are handed out one at a time as workers become free, so the costly
+# tiles inside the set don't hold up a whole static chunk of the grid, and
+# every worker writes its results into one shared memory block (see render_tile)
+# workers can also be a pool that's already running (say, one that's kept
+# across several renders), which is left running
+# if cancel (a threading.Event) is set while the tiles are being calculated,
+# the remaining tiles are dropped and Cancelled is raised
+# if adaptive is True (and shortcuts is False), every tile gets it's own
+# iteration budget (see tile_budgets and k_factor_axes)
+def k_factor_axes_tiled(xs, ys, max_iter = 100, inf = 10, strategy = "full", shortcuts = True, stats = None, mirror = True, workers = None, tile_size = 128, cancel = None, show_status = False, adaptive = False):
+    rows, source = mirrored_rows(ys) if mirror else (np.arange(ys.size), np.arange(ys.size))
+    shape = (xs.size, rows.size)
+
+    tiles = run_tiles(rows, xs.size, tile_size)
+    budgets = tile_budgets(xs, ys[rows], tiles, max_iter, inf, stats = stats) if adaptive and not shortcuts else [None]*len(tiles)
+
+    shm = shared_memory.SharedMemory(create = True, size = max(1, 8*shape[0]*shape[1]))
+    out = np.ndarray(shape, dtype = np.float64, buffer = shm.buf)
+    try:
+        with worker_pool(workers) as pool:
+            futures = [pool.submit(render_tile, shm.name, shape, xs[i0:i1], ys[rows[j0:j1]], i0, i1, j0, j1, max_iter, inf, strategy, shortcuts, budget)
+                       for (i0, i1, j0, j1), budget in zip(tiles, budgets)]
+            for n, future in enumerate(as_completed(futures)):
+                if cancel is not None and cancel.is_set():
+                    for f in futures:
+                        f.cancel()
+                    raise Cancelled()
+                add_stats(stats, **future.result())
+                if show_status:
+                    print_status((n+1)/len(futures))
+        kfs = out[:, source]
+    finally:
+        del out
+        shm.close()
+        shm.unlink()
+
+    if show_status:
+        print()
+
+    return kfs
+
+
+# same as k_factor_grid, but calculated on a pool of processes (see k_factor_axes_tiled)
+def k_factor_grid_tiled(x1, x2, y1, y2, delta, max_iter = 100, inf = 10, strategy = "full", shortcuts = True, stats = None, mirror = True, workers = None, tile_size = 128, show_status = False):
+    xs, ys = grid_axes(x1, x2, y1, y2, delta, mirror)
+    return k_factor_axes_tiled(xs, ys, max_iter, inf, strategy, shortcuts, stats, mirror, workers, tile_size, show_status = show_status)
+
+
+# k-factors for the grid with abscissae xs and ordinates ys, calculated on a
+# pool of `workers` processes (all the cores if None, in this process if 1, or
+# on workers itself, if it's a pool, see k_factor_axes_tiled),
+# with the given strategy (see axes_k_factors)
+# cancel is as in k_factor_axes_tiled (and is only checked by the process pool)
+# if adaptive is True, every tile gets it's own iteration budget (see
+# tile_budgets), which is only done when shortcuts is False (see k_factor_axes)
+# if show_status is True, the progress and the iteration counts are printed
+def calculate_k_factors(xs, ys, max_iter = 100, inf = 10, strategy = "full", workers = None, cancel = None, show_status = False, adaptive = False, shortcuts = True):
+    stats = {}
+    if workers == 1:
+        kfs = k_factor_axes(xs, ys, max_iter, inf, strategy, shortcuts, stats = stats, show_status = show_status, adaptive = adaptive)
+    else:
+        kfs = k_factor_axes_tiled(xs, ys, max_iter, inf, strategy, shortcuts, stats = stats, workers = workers, cancel = cancel, show_status = show_status, adaptive = adaptive)
+
+    if show_status:
+        print("Iterations performed: %d, saved by the interior shortcuts: %d, points filled in: %d" % (stats.get("iterations", 0), stats.get("saved", 0), stats.get("filled", 0)))
+        # the iterations cut by the budgets are an upper bound, and the coarse
+        # pass's iterations (already counted as performed) are taken off them
+        if "coarse" in stats:
+            print("Iterations cut by the adaptive budgets: %d (at most), spent on the coarse pass: %d, net saving: %d (at most)"
+                  % (stats.get("cut", 0), stats["coarse"], stats.get("cut", 0) - stats["coarse"]))
+
+    return kfs
+
+
+# calculates the k-factors of the grid with abscissae xs and ordinates ys a
+# block of `rows` abscissae at a time, and yields (i0, i1, kfs) for every block
+# as soon as it's done, kfs being the k-factors for xs[i0:i1] and ys, so that
+# only a block's worth of them is held at once
+# all the blocks are calculated on one pool of `workers` processes (see
+# worker_pool in utils.py), which is started once, rather than for every block
+# the other parameters are as in calculate_k_factors
+def k_factor_blocks(xs, ys, max_iter = 100, inf = 10, strategy = "full", workers = None, rows = 256, cancel = None, show_status = False, adaptive = False, shortcuts = True):
+    with worker_pool(workers) if workers != 1 else contextlib.nullcontext(1) as pool:
+        for i0 in range(0, xs.size, rows):
+            i1 = min(i0 + rows, xs.size)
+            yield (i0, i1, calculate_k_factors(xs[i0:i1], ys, max_iter, inf, strategy, pool, cancel, show_status, adaptive, shortcuts))
+
+
+# calculates the k-factors of the grid with abscissae xs and ordinates ys in
+# passes over ever finer sub-grids: every strides[0]-th point along both axes,
+# then every strides[1]-th one, and so on, where every stride divides the one
+# before it (the default is 1/16th of the points, then 1/4th, then all of them)
+# each pass only calculates the points that the passes before it didn't, and
+# only in the rows that aren't mirror images of others (see mirrored_rows),
+# which are found once, on the whole grid (the sub-grids' own rows hardly ever
+# mirror each other); the last pass, with a stride of 1, is the whole grid,
+# calculated at once, so that it's exactly what calculate_k_factors gives
+# every pass is yielded as (stride, kfs) once it's done, where kfs is the whole
+# (xs.size, ys.size) grid, with the points not calculated yet holding NaN
+# the other parameters are as in calculate_k_factors, and Cancelled is raised
+# if cancel is set between (or during) the passes
+def progressive_k_factors(xs, ys, max_iter = 100, inf = 10, strategy = "full", workers = None, strides = (4, 2, 1), cancel = None, adaptive = False, shortcuts = True):
+    rows, source = mirrored_rows(ys)
+    kfs = np.full((xs.size, rows.size), np.nan)     # the k-factors of the calculated rows
+    last = None
+    for stride in strides:
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        if stride == 1:
+            yield (stride, calculate_k_factors(xs, ys, max_iter, inf, strategy, workers, cancel, adaptive = adaptive, shortcuts = shortcuts))
+            return
+
+        # the calculated rows that this pass's rows come from, and the grids
+        # (of abscissae and those rows) that make up what's left of the pass:
+        # the abscissae of the last pass, in the rows it didn't need, and the
+        # abscissae in between them, in all of the rows
+        needed = np.unique(source[::stride])
+        if last is None:
+            grids = [(slice(None, None, stride), needed)]
+        else:
+            grids = [(slice(None, None, last), needed[np.isnan(kfs[0, needed])])]
+            grids += [(slice(a, None, last), needed) for a in range(stride, last, stride)]
+
+        for cols, calc_rows in grids:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled()
+            if calc_rows.size:
+                kfs[cols, calc_rows] = calculate_k_factors(xs[cols], ys[rows[calc_rows]], max_iter, inf, strategy, workers, cancel, adaptive = adaptive, shortcuts = shortcuts)
+
+        last = stride
+        yield (stride, kfs[:, source])
+
+
+# returns a point cloud (see GridCloud in utils.py) of all the points (x, y)
+# such that x1 <= x <= x2 and y1 <= y <= y2, sampled at differences of delta,
+# with the k-factors for these points as it's values, evaluated with
+# max_iter and inf as it's parameters (see k_factor)
+# the k-factors are calculated for the whole grid at once, on a pool of
+# `workers` processes (all the cores if None, in this process if 1), skipping
+# the points which are known to be inside the set (see k_factors)
+# the grid's ordinates are aligned to multiples of delta, so that only the
+# rows on one side of the real axis need to be calculated, and the rest are
+# copied from their mirror images (see grid_axes and mirrored_rows)
+# strategy is "full" to iterate every point of the grid, or "subdivide" to
+# only iterate the borders of regions with a uniform k-factor and fill them in
+# (see k_factors_subdivided)
+# the k-factors are saved in an on-disk cache, and reused from there
+# whenever the same grid is asked for again (see cache.py)
+# if chunk is given, the k-factors are calculated `chunk` abscissae at a time
+# instead, and a point cloud is yielded for every such block of the grid as
+# soon as it's done, bypassing the cache (see k_factor_blocks)
+# if show_status is True, the progress of these calculations is printed
+def gen_mandelbrot_pts(x1, x2, y1, y2, delta, max_iter = 100, inf = 10, strategy = "full", workers = None, show_status = False, chunk = None):
+    # if show_status is set to True, display the progress
+    if show_status:
+        print("\n\n")
+
+    xs, ys = grid_axes(x1, x2, y1, y2, delta, aligned = True)
+    if chunk is not None:
+        return (GridCloud(xs[i0:i1], ys, kfs)
+                for i0, i1, kfs in k_factor_blocks(xs, ys, max_iter, inf, strategy, workers, chunk, show_status = show_status))
+
+    kfs = cached_k_factors(lambda : calculate_k_factors(xs, ys, max_iter, inf, strategy, workers, show_status = show_status),
+                           xs, ys, max_iter, inf, strategy, show_status = show_status)
+    return GridCloud(xs, ys, kfs)
+
+
+# screen coordinates of n evenly spread samples inside each of the npx pixels
+# along one of the screen's axes, i.e. px + (a + 0.5)/n for 0 <= a < n, for
+# every pixel px (with n = 1, these are just the pixels' centres)
+def pixel_samples(npx, n = 1):
+    return (np.arange(npx)[:, None] + (np.arange(n) + 0.5)/n).ravel()
+
+
+# the abscissae and ordinates of the grid of n x n samples inside every pixel of
+# a screen `width` x `height` pixels large (see pixel_samples), mapped back into
+# the Cartesian plane with inverse_map_func (see snowman_map in utils.py), which
+# sends the screen's height along the real axis and it's width along the
+# imaginary axis, so that the samples make up a grid in the plane as well
+def pixel_axes(inverse_map_func, width, height, n = 1):
+    return (inverse_map_func(0, pixel_samples(height, n))[0], inverse_map_func(pixel_samples(width, n), 0)[1])
+
+
+# regroups the k-factors of a grid of pixel samples, with n x n samples per
+# pixel (see pixel_samples), whose rows run along the screen's height and whose
+# columns run along it's width, into a (width, height, n*n) array, so that
+# kfs[px, py] holds all the samples of the pixel (px, py)
+def group_pixel_samples(kfs, n = 1):
+    height, width = kfs.shape[0]//n, kfs.shape[1]//n
+    return kfs.reshape(height, n, width, n).transpose(2, 0, 1, 3).reshape(width, height, n*n)
+
+
+# the orbit z_0 = c, z_{n+1} = z_n^2 + c of the point c = cr + ci*1j, where
+# cr and ci are Decimals (or strings), so that c can be given to any precision
+# the orbit is calculated with `digits` significant digits, up to (and
+# including) it's first point outside inf, or up to max_iter points; it's
+# returned rounded to floats, as the arrays of it's real and imaginary parts
+def reference_orbit(cr, ci, max_iter, inf, digits):
+    with decimal.localcontext() as ctx:
+        ctx.prec = digits
+        cr, ci = decimal.Decimal(cr), decimal.Decimal(ci)
+        zr, zi = +cr, +ci
+        inf2 = decimal.Decimal(inf)**2
+        orbit = []
+        for i in range(int(max_iter)):
+            orbit.append((float(zr), float(zi)))
+            if zr*zr + zi*zi > inf2:
+                break
+            zr, zi = zr*zr - zi*zi + cr, 2*zr*zi + ci
+
+    orbit = np.array(orbit).reshape(-1, 2)
+    return orbit[:, 0].copy(), orbit[:, 1].copy()
+
+
+# k-factors for an array of points, given by their offsets (dcr, dci) from
+# the point whose reference orbit is (zr, zi) (see reference_orbit)
+# only the offsets of the points' orbits from the reference orbit are
+# iterated, which stay small enough for double precision, however deep the
+# zoom is:  d_{n+1} = 2*Z_n*d_n + d_n^2 + dc,  with d_0 = dc
+#
+# an offset can't be trusted once the point's orbit comes much closer to 0
+# than the reference orbit does (|Z_n + d_n| < glitch_tol*|Z_n|), or once the
+# reference orbit has escaped while the point's hasn't; such points are
+# "glitched", and have to be calculated again with another reference
+# returns the k-factors (NaN for the glitched points), and for every glitched
+# point, how far it's orbit was from 0 relative to the reference's when the
+# glitch was found (1 if the reference escaped, see next_reference)
+# if stats is a dictionary, the number of iterations performed is added to it
+def perturbed_k_factors(dcr, dci, zr, zi, max_iter = 100, inf = 10, glitch_tol = 1e-3, stats = None):
+    dcr = np.asarray(dcr, dtype = np.float64).ravel()
+    dci = np.asarray(dci, dtype = np.float64).ravel()
+
+    kfs = np.ones(dcr.size)
+    glitch = np.full(dcr.size, np.inf)
+    idx = np.arange(dcr.size)
+    dr, di = dcr.copy(), dci.copy()
+    iterations = 0
+
+    for i in range(int(max_iter)):
+        if idx.size == 0:
+            break
+        # the reference orbit has escaped, the points still iterating can't
+        # follow it any further
+        if i >= zr.size:
+            kfs[idx] = np.nan
+            glitch[idx] = 1
+            break
+
+        r = np.hypot(zr[i] + dr, zi[i] + di)
+        escaped = r > inf
+        glitched = ~escaped & (r < glitch_tol*math.hypot(zr[i], zi[i]))
+        done = escaped | glitched
+        if done.any():
+            kfs[idx[escaped]] = i/(max_iter-1)
+            kfs[idx[glitched]] = np.nan
+            glitch[idx[glitched]] = r[glitched]/math.hypot(zr[i], zi[i])
+            left = ~done
+            idx, dr, di, dcr, dci = idx[left], dr[left], di[left], dcr[left], dci[left]
+
+        dr, di = 2*(zr[i]*dr - zi[i]*di) + dr*dr - di*di + dcr, 2*(zr[i]*di + zi[i]*dr) + 2*dr*di + dci
+        iterations += idx.size
+
+    add_stats(stats, iterations = iterations)
+    return kfs, glitch
+
+
+# the index (into dcr and dci) of the glitched point to take as the next
+# reference, given the glitch array of the glitched points (see
+# perturbed_k_factors): the points whose orbits came the closest to 0 make up
+# the glitch's core, and of those, the one nearest to their centre is taken
+# (once the reference has escaped, every point still iterating is tied, and
+# the core is the whole glitched region)
+def next_reference(dcr, dci, glitch):
+    core = np.flatnonzero(glitch == glitch.min())
+    dist = np.hypot(dcr[core] - dcr[core].mean(), dci[core] - dci[core].mean())
+    return core[np.argmin(dist)]
+
+
+# k-factors for the grid with abscissae cr + xs and ordinates ci + ys, as an
+# (xs.size, ys.size) array, for zooms too deep for double precision (where
+# the spacing of the grid is below about 1e-13 times it's distance from 0)
+# the centre (cr, ci) is given as Decimals (or strings) to full precision,
+# and the offsets xs and ys from it as floats
+# only one orbit, the reference, is calculated with `digits` significant
+# digits (enough for the grid's spacing, if None), starting at the centre;
+# every other point is iterated as an offset from it (see perturbed_k_factors)
+# the points glitched with one reference are calculated again, with a new
+# reference picked among them (see next_reference), up to max_refs references
+# in all; any glitched points that are left after that are marked as
+# unresolved, with a k-factor of NaN
+# if stats is a dictionary, the number of iterations performed, references
+# used, glitched points and unresolved points are added to it, as
+# stats["iterations"], stats["references"], stats["glitches"] and
+# stats["unresolved"]
+def deep_k_factor_axes(cr, ci, xs, ys, max_iter = 100, inf = 10, digits = None, max_refs = 32, stats = None):
+    xs = np.asarray(xs, dtype = np.float64)
+    ys = np.asarray(ys, dtype = np.float64)
+    cr, ci = decimal.Decimal(cr), decimal.Decimal(ci)
+    if digits is None:
+        spacing = min(np.abs(np.diff(xs)).min(initial = 1), np.abs(np.diff(ys)).min(initial = 1))
+        digits = max(20, int(-math.log10(spacing)) + 20)
+
+    dcr, dci = np.meshgrid(xs, ys, indexing = "ij")
+    dcr, dci = dcr.ravel(), dci.ravel()
+    kfs = np.full(dcr.size, np.nan)
+    todo = np.arange(dcr.size)
+    ref = (0.0, 0.0)            # the reference's offset from the centre
+
+    for n_refs in range(1, max_refs + 1):
+        with decimal.localcontext() as ctx:
+            ctx.prec = digits
+            ref_r, ref_i = cr + decimal.Decimal(ref[0]), ci + decimal.Decimal(ref[1])
+        zr, zi = reference_orbit(ref_r, ref_i, max_iter, inf, digits)
+        found, glitch = perturbed_k_factors(dcr[todo] - ref[0], dci[todo] - ref[1], zr, zi, max_iter, inf, stats = stats)
+        kfs[todo] = found
+        glitched = np.isnan(found)
+        add_stats(stats, references = 1, glitches = np.count_nonzero(glitched))
+        if not glitched.any():
+            break
+        todo = todo[glitched]
+        core = todo[next_reference(dcr[todo], dci[todo], glitch[glitched])]
+        ref = (dcr[core], dci[core])
+
+    add_stats(stats, unresolved = np.count_nonzero(np.isnan(kfs)))
+    return kfs.reshape(xs.size, ys.size)
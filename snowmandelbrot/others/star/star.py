@@ -5,31 +5,55 @@ sys.path.insert(1, sys.path[0] + "/../..")
 
 import pygame
 from utils import *
+from tiles import *
 
 
-# pygame initialization
-pygame.init()
 width = 10000
 height = 10000
-surf = pygame.display.set_mode((width, height))
-pygame.display.set_caption("Star")
-surf.fill((0,0,0))      # black background
-
-
-# plot points inside pts_list, by lighting up pixels at
-# those coordinates. color_func decides the color based on
-# the points' coordinates
-def plot_pts(pts_list, color_func = lambda pt : (255,255,255), surface = surf):
-    for pt in pts_list:
-        pt = (int(pt[0]), height - int(pt[1]))      # integer coordinates and y-coordinate flipping
-        surface.set_at(pt, color_func(pt))
-
-
-# the star's points and color function
-star_pts = gen_star_pts(width/2, height/2, 5300, 10000000)
+# if tiled is True, the image is rendered out of core (see TiledCanvas in
+# tiles.py): the star's hit counts are kept in a memory-mapped file, and the
+# image is colored and written to disk a strip of rows at a time, so it can be
+# far larger than what a pygame surface (or the RAM) can hold
+tiled = True
+chunk_size = 65536          # points per chunk, as they're binned to the strips
+
+# pygame initialization (the surface is only needed if the image isn't tiled)
+surf = None
+if not tiled:
+    pygame.init()
+    surf = pygame.display.set_mode((width, height))
+    pygame.display.set_caption("Star")
+    surf.fill((0,0,0))      # black background
+
+
+# lights up the pixels that were hit in density (see add_density in utils.py),
+# with color_func deciding their colors based on their coordinates, like plot_pts
+# if log_tone is True, the colors are faded towards black for pixels hit only
+# a few times, going by the logarithm of their hit counts (so that the star's
+# denser parts stand out)
+def plot_density(density, color_func = lambda pt : (255,255,255), surface = surf, log_tone = False):
+    xs, ys = np.nonzero(density)
+    cols = pixel_colors(color_func, xs, ys)
+    if log_tone and xs.size:
+        cols = cols*(np.log1p(density[xs, ys])/np.log1p(density.max()))[:, None]
+    blit_pixels(surface, xs, ys, cols)
+
+
+# the star's color function
 col_func = circ_gradient(width/2, height/2, (red, green, blue), 5000)
-plot_pts(star_pts, col_func, surf)
 
-pygame.image.save(surf, "star-chaos.png")
-print("\nDone saving")
+if tiled:
+    # the star's points, binned to the canvas's strips a chunk at a time as
+    # they're generated, and the image, streamed to the PNG file strip by strip
+    with TiledCanvas(width, height) as canvas:
+        for pts in gen_star_pts(width/2, height/2, 5300, 10000000, chunk = chunk_size):
+            canvas.add(pts)
+        canvas.save_png("star-chaos.png", col_func)
+else:
+    # the star's points, counted up in a per-pixel histogram as they're generated
+    # (so that they never have to be stored all at once)
+    star_density = gen_star_pts(width/2, height/2, 5300, 10000000, density = np.zeros((width, height), dtype = np.uint32))
+    plot_density(star_density, col_func, surf)
+    pygame.image.save(surf, "star-chaos.png")
 
+print("\nDone saving")
@@ -0,0 +1,342 @@
+"""scene.py
+Renders scenes described in JSON (or TOML) files, such as the ones in the
+`scenes` directory, and saves them in the current working directory (or --out)
+
+    python scene.py scenes/snowmandelbrot.json scenes/sierpinski-tree.toml --size 3840x2160 --size 1920x1080
+
+Every scene is rendered at every size in the same process, sharing one pool of
+worker processes, the k-factor cache (see cache.py) and the compiled color
+maps (see gradient_lut in utils.py), so that only the first image pays for
+starting them up
+
+A scene is a dictionary with it's name, size (which --size overrides),
+background color, seed and a list of layers, drawn in order, each of them
+being a dictionary with it's type and parameters (see layer_types below)
+Positions are given as fractions of the image's width and height, measured
+from it's bottom left corner, and lengths as fractions of it's height, so a
+scene looks the same at every size
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import time
+
+try:
+    import tomllib
+except ImportError:         # Python < 3.11
+    tomllib = None
+
+import pygame
+from utils import *
+from mandel import *
+from cache import *
+
+
+# reads the scene in the JSON or TOML file at path (going by it's extension),
+# named after the file unless it's named in it
+def load_scene(path):
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("TOML scenes need Python 3.11 or later: %s" % path)
+        with open(path, "rb") as f:
+            scene = tomllib.load(f)
+    else:
+        with open(path) as f:
+            scene = json.load(f)
+    scene.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return scene
+
+
+# turns the scene's units into pixels, for an image of the given size
+class Frame:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    # the point pos, as the generators take it (measured from the bottom left)
+    def point(self, pos):
+        return (pos[0]*self.width, pos[1]*self.height)
+
+    # the point pos on the screen (measured from the top left, as the color
+    # functions get them, see pixel_colors in utils.py)
+    def screen(self, pos):
+        return (pos[0]*self.width, self.height - pos[1]*self.height)
+
+    def length(self, l):
+        return l*self.height
+
+
+# the colors, and the color maps (see utils.py), that scenes can name
+named_colors = {
+    "red": red,
+    "green": green,
+    "blue": blue,
+    "white": white,
+    "black": black,
+    "cyan": cyan,
+    "violet": violet,
+    "indigo": indigo,
+    "yellow": yellow,
+    "orange": orange,
+}
+color_maps = {
+    "grayscale1": grayscale1,
+    "grayscale2": grayscale2,
+    "rainbow": rainbow,
+    "fire": fire,
+    "ice": ice,
+    "snow": snow,
+}
+
+
+# a color, given as an RGB triple or the name of one of named_colors
+def color(spec):
+    if isinstance(spec, str):
+        if spec not in named_colors:
+            raise ValueError("unknown color: %r" % spec)
+        spec = named_colors[spec]
+    return tuple(spec)
+
+
+# the color function that spec stands for, which is one of
+#   - the name of one of color_maps or named_colors ("snow", "red", ...)
+#   - an RGB triple, for a single color
+#   - a dictionary with one of the keys "circ_gradient", "radial_gradient" or
+#     "linear_gradient", holding that gradient's parameters (as it's keyword
+#     arguments, with the centre as `centre` and lengths in the scene's units)
+# single colors are returned as they are (blit_pixels takes them as well)
+def color_func(spec, frame):
+    if isinstance(spec, str) and spec in color_maps:
+        return color_maps[spec]
+    if not isinstance(spec, dict):
+        return color(spec)
+
+    (kind, params), = spec.items()
+    cols = [color(col) for col in params["cols"]]
+    if kind == "linear_gradient":
+        special_col = params.get("special_col")
+        return linear_gradient(cols, None if special_col is None else color(special_col))
+
+    x0, y0 = frame.screen(params["centre"])
+    r_max = frame.length(params["r_max"])
+    if kind == "circ_gradient":
+        return circ_gradient(x0, y0, cols, r_max, params.get("offset", 0))
+    if kind == "radial_gradient":
+        return radial_gradient(x0, y0, cols, r_max)
+    raise ValueError("unknown color function: %r" % kind)
+
+
+# draws pts (an (N, 2) array, a PointCloud, or chunks of either, as the
+# generators give them) onto surface, colored by col_func (or a single color)
+def draw_pts(surface, pts, col_func):
+    if isinstance(pts, (np.ndarray, PointCloud)):
+        pts = [pts]
+    for chunk_pts in pts:
+        x, y = screen_pixels(chunk_pts, surface.get_height())
+        cols = col_func if isinstance(col_func, tuple) else pixel_colors(col_func, x, y)
+        blit_pixels(surface, x, y, cols)
+
+
+# the Mandelbrot set, as a snowman: the real axis runs up the image, at `axis`
+# of it's width, with the real part being `bottom` at it's bottom edge, and
+# one unit of the plane being `scale` of the image's height
+# the screen's pixels are walked and mapped back into the plane, with
+# supersample x supersample samples in each of them (see gen_mandelbrot_pixels
+# in sv-main.py), and the k-factors are kept in the on-disk cache
+# adaptive and shortcuts are as in calculate_k_factors (in mandel.py)
+# this layer covers the whole image
+def draw_mandelbrot(surface, layer, frame, seed, workers, show_status):
+    scale = frame.length(layer.get("scale", 0.375))
+    bottom = layer.get("bottom", 0.4)
+    n = layer.get("supersample", 1)
+    max_iter = layer.get("max_iter", 250)
+    inf = layer.get("inf", 25)
+    strategy = layer.get("strategy", "subdivide")
+    adaptive = layer.get("adaptive", False)
+    shortcuts = layer.get("shortcuts", True)
+
+    inverse_map_func = snowman_map(frame.width, frame.height, scale, bottom, layer.get("axis", 0.5))[1]
+    xs, ys = pixel_axes(inverse_map_func, frame.width, frame.height, n)
+    kfs = cached_k_factors(lambda : calculate_k_factors(xs, ys, max_iter, inf, strategy, workers, show_status = show_status, adaptive = adaptive, shortcuts = shortcuts),
+                           xs, ys, max_iter, inf, strategy, show_status = show_status, adaptive = adaptive, shortcuts = shortcuts)
+    col_func = color_func(layer.get("color", "snow"), frame)
+    blit_colors(surface, value_colors(col_func, group_pixel_samples(kfs, n)).mean(axis = 2))
+
+
+# a Sierpinski triangle, centred at pos, with a side of `side`
+def draw_triangle(surface, layer, frame, seed, workers, show_status):
+    x0, y0 = frame.point(layer["pos"])
+    pts = gen_triangle_pts(x0, y0, frame.length(layer["side"]), layer["points"], seed = seed, workers = workers, chunk = layer.get("chunk"))
+    draw_pts(surface, pts, color_func(layer.get("color", white), frame))
+
+
+# the star (see gen_star_pts), centred at pos, with a pentagon of side `side`
+def draw_star(surface, layer, frame, seed, workers, show_status):
+    x0, y0 = frame.point(layer["pos"])
+    pts = gen_star_pts(x0, y0, frame.length(layer["side"]), layer["points"], layer.get("angle", 0), seed = seed, workers = workers, chunk = layer.get("chunk"))
+    draw_pts(surface, pts, color_func(layer.get("color", white), frame))
+
+
+# a Sierpinski Christmas tree of `levels` triangles, the bottom-most one
+# centred at pos, each of them with a side of `side`
+def draw_tree(surface, layer, frame, seed, workers, show_status):
+    x0, y0 = frame.point(layer["pos"])
+    pts = gen_tree_pts(x0, y0, frame.length(layer["side"]), layer.get("levels", 3), layer["points"], seed = seed, workers = workers, chunk = layer.get("chunk"))
+    draw_pts(surface, pts, color_func(layer.get("color", white), frame))
+
+
+# a Sierpinski carpet centred at pos, `length` long and `width` wide
+def draw_carpet(surface, layer, frame, seed, workers, show_status):
+    x0, y0 = frame.point(layer["pos"])
+    pts = gen_carpet_pts(x0, y0, frame.length(layer["length"]), frame.length(layer["width"]), layer["points"], seed = seed, workers = workers, chunk = layer.get("chunk"))
+    draw_pts(surface, pts, color_func(layer.get("color", white), frame))
+
+
+# a Vicsek fractal centred at pos, with a side of `side`, turned by `angle`
+def draw_vicsek(surface, layer, frame, seed, workers, show_status):
+    x0, y0 = frame.point(layer["pos"])
+    pts = gen_vicsek_pts(x0, y0, frame.length(layer["side"]), layer.get("angle", 0), layer["points"], seed = seed, workers = workers, chunk = layer.get("chunk"))
+    draw_pts(surface, pts, color_func(layer.get("color", white), frame))
+
+
+# `count` Vicsek snowflakes, randomly placed, sized, oriented and colored, the
+# way sierpinski-tree/sv-main.py places them: each one is `gap[0]` to `gap[1]`
+# of the image's width to the left or right of it's centre, at least `margin`
+# away from it's top and bottom edges, with a side between size[0] and size[1],
+# and a radial gradient between two random mixes of the colors `colors`
+# unless instanced is false, every snowflake is one of a few Vicsek fractals,
+# generated once and cached (across scenes as well), then scaled, turned and
+# moved (see gen_vicsek_instance in utils.py), instead of playing the chaos
+# game for each of them; the largest snowflakes get `points` points, and the
+# smaller ones fewer, going by their size (see vicsek_class)
+# with a seed, the layout and the snowflakes' points are seeded as well
+def draw_snowflakes(surface, layer, frame, seed, workers, show_status):
+    count = layer.get("count", 25)
+    gap = layer.get("gap", (0.16, 0.5))
+    margin = frame.length(layer.get("margin", 50/2160))
+    min_size, max_size = (frame.length(l) for l in layer.get("size", (30/2160, 180/2160)))
+    col1, col2 = (color(col) for col in layer.get("colors", (cyan, blue)))
+    npts = layer.get("points", 100000)
+    instanced = layer.get("instanced", True)
+
+    if seed is None:
+        rng, seeds, canonical_seed = random, [None]*count, None
+    else:
+        rng, seeds = random.Random(int(seed.generate_state(1)[0])), seed.spawn(count)
+        canonical_seed = rng.getrandbits(64)
+
+    for flake_seed in seeds:
+        x = frame.width/2 + rng.choice([1, -1])*(gap[0] + rng.random()*(gap[1] - gap[0]))*frame.width
+        y = margin + rng.random()*(frame.height - 2*margin)
+        angle = rng.random()*2*pi
+        size = min_size + (max_size - min_size)*rng.random()
+        initial_col = ratio_div_3d(col1, col2, 0.5 + 0.5*rng.random())
+        terminal_col = ratio_div_3d(col1, col2, 0.1 + 0.4*rng.random())
+
+        if instanced:
+            pts = gen_vicsek_instance(x, y, size, angle, vicsek_class(npts, size, max_size), canonical_seed)
+        else:
+            pts = gen_vicsek_pts(x, y, size, angle, npts, seed = flake_seed, workers = workers, chunk = layer.get("chunk"))
+        draw_pts(surface, pts, radial_gradient(x, frame.height - y, (initial_col, terminal_col), 0.5*size))
+
+
+# the layers' types, and the functions that draw them
+layer_types = {
+    "mandelbrot": draw_mandelbrot,
+    "triangle": draw_triangle,
+    "star": draw_star,
+    "tree": draw_tree,
+    "carpet": draw_carpet,
+    "vicsek": draw_vicsek,
+    "snowflakes": draw_snowflakes,
+}
+
+# the types of the layers that split their own work into tiles, and spread
+# them over the pool (see k_factor_axes_tiled in mandel.py)
+tiled_layers = {"mandelbrot"}
+
+
+# draws layer on a surface of it's own, of the given size (see layer_surface
+# in utils.py), with the pool (or number of processes) `workers`, and returns
+# it's pixels (see drawn_pixels)
+# this is what the worker processes of render_scene do, with parallel set
+# (with workers = 1, in the worker process itself)
+def render_layer(layer, size, seed, show_status = False, workers = 1):
+    surface = layer_surface(size)
+    layer_types[layer["type"]](surface, layer, Frame(*size), seed, workers, show_status)
+    return drawn_pixels(surface)
+
+
+# renders scene (see load_scene) on an offscreen surface of the given size (the
+# scene's own, if None), using the pool (or number of processes) `workers`
+# every layer gets a seed of it's own, spawned from the scene's seed (or from
+# fresh entropy, if it has none), so adding a layer doesn't change the ones
+# before it
+# if parallel is True (and workers is a pool), the layers are drawn at the
+# same time, each one on it's own surface (see render_layer), and laid over one
+# another in order, which gives exactly the same image, in about the time the
+# slowest of them takes: every layer is drawn by one of the pool's processes,
+# except for the tiled ones (see tiled_layers), which are drawn here, while the
+# others are being drawn, with their tiles spread over the whole pool
+def render_scene(scene, size = None, workers = None, show_status = False, parallel = False):
+    width, height = size = tuple(size or scene.get("size", (3840, 2160)))
+    frame = Frame(width, height)
+    surface = pygame.Surface((width, height))
+    surface.fill(color(scene.get("background", black)))
+
+    layers = scene.get("layers", [])
+    for layer in layers:
+        if layer["type"] not in layer_types:
+            raise ValueError("unknown layer type: %r" % layer["type"])
+    seeds = np.random.SeedSequence(scene.get("seed")).spawn(len(layers))
+
+    if parallel and isinstance(workers, Executor):
+        futures = {i : workers.submit(render_layer, layer, size, seed, show_status)
+                   for i, (layer, seed) in enumerate(zip(layers, seeds)) if layer["type"] not in tiled_layers}
+        tiled = {i : render_layer(layer, size, seed, show_status, workers)
+                 for i, (layer, seed) in enumerate(zip(layers, seeds)) if i not in futures}
+        for i in range(len(layers)):
+            overlay_pixels(surface, *(tiled[i] if i in tiled else futures[i].result()))
+    else:
+        for layer, seed in zip(layers, seeds):
+            layer_types[layer["type"]](surface, layer, frame, seed, workers, show_status)
+
+    return surface
+
+
+# parses a size like 3840x2160
+def parse_size(s):
+    width, height = s.lower().split("x")
+    return (int(width), int(height))
+
+
+# renders every scene at every size given on the command line, one after the
+# other, on one pool of worker processes that's kept for all of them
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Render scenes described in JSON or TOML files.")
+    parser.add_argument("scenes", nargs = "+", help = "scene files (.json or .toml)")
+    parser.add_argument("--size", action = "append", type = parse_size, help = "image size, like 3840x2160 (can be given more than once; the scene's own size by default)")
+    parser.add_argument("--out", default = ".", help = "directory to save the images in")
+    parser.add_argument("--workers", type = int, default = None, help = "number of worker processes (all the cores by default, 1 to render in this process)")
+    parser.add_argument("--status", action = "store_true", help = "print the progress of the Mandelbrot set's calculations")
+    parser.add_argument("--parallel-layers", action = "store_true", help = "draw a scene's layers at the same time, one per worker process, and lay them over one another")
+    args = parser.parse_args(argv)
+
+    scenes = [load_scene(path) for path in args.scenes]
+    os.makedirs(args.out, exist_ok = True)
+
+    with worker_pool(args.workers) if args.workers != 1 else contextlib.nullcontext(1) as workers:
+        for scene in scenes:
+            for size in args.size or [None]:
+                start = time.perf_counter()
+                surface = render_scene(scene, size, workers, args.status, args.parallel_layers)
+                path = os.path.join(args.out, "%s-%dx%d.png" % ((scene["name"],) + surface.get_size()))
+                pygame.image.save(surface, path)
+                print("Saved %s (%.1f s)" % (path, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,110 +1,89 @@
 """sv-main.py
-The main Python file for generating and saving a 4K image. Rendering this image will take a considerable amount of time (around 3.5 minutes) and the image will be saved in the current working directory.
+The main Python file for generating and saving a 4K image. Rendering this image takes around 5 seconds, and the image will be saved in the current working directory.
 
 """
 
 import pygame
 from utils import *
+from mandel import *
+from cache import *
 
-# pygame initialization
-pygame.init()
 # 4K resolution
 width = 3840
 height = 2160
-surf = pygame.display.set_mode((width, height))
-pygame.display.set_caption("Snowmandelbrot 4K")
+# the image is only saved, never shown, so it's drawn on an offscreen surface,
+# without initializing pygame's display (or needing one at all)
+surf = pygame.Surface((width, height))
 surf.fill((0,0,0))      # black background
 
 scale = 810                 # one unit on the real number line = `scale` pixels
+chunk_size = 65536          # points per chunk, for the chaos game generators (see plot_chunks)
 
 
-# this real number is equal to the number of iterations of
-# the Mandelbrot formula (z_{n+1} = z_{n}^2 + z_0), after which
-# the point z goes outside inf (i.e. |z| > inf), divided by max_iter
-# for a point that never goes outside inf, it returns 1
-def k_factor(z, max_iter, inf):
-    z0 = z
-    for i in range(int(max_iter)):
-        if abs(z) > inf:
-            return i/(max_iter-1)
-        z = z**2 + z0
-    return 1
-
-
-# returns two lists in a tuple, say (p, k), where
-# p are all the points (x, y) such that x1 <= x <= x2 and y1 <= y <= y2,
-# sampled at differences of delta
-# k is the list of the k-factors for these points, evaluated with
-# max_iter and inf as it's parameters
-# if show_status is True, the progress of these calculations is printed
-def gen_mandelbrot_pts(x1, x2, y1, y2, delta, max_iter = 100, inf = 10, show_status = False):
-    x_pts = int((x2-x1)/delta)              # no. of points along the grid's length
-    y_pts = int((y2-y1)/delta)              # no. of points along the grid's width
-    total_pts = x_pts * y_pts               # no. of total points in the grid
-    pts_list = []                           # the list p, from the comment before the function
-
-    # if show_status is set to True, display the progress
-    if show_status:
-        print("\n\n")
-        for i in range(x_pts):
-            for j in range(y_pts):
-                progress = i*y_pts + j + 1
-                print("\rMandelbrot calculation progress: " + "#"*int((progress/total_pts)*50) + "-"*int((1 - progress/total_pts)*50), end = "")
-                pts_list.append(complex(x1+i*delta, y1+j*delta))
-
-    # if show_status is False, the calculations are faster,
-    # as list comprehension is used instead of two nested for loops
-    else:
-        pts_list = [complex(x1+i*delta, y1+j*delta) for i in range(x_pts) for j in range(y_pts)]
-
-    # this list is k, from the comment before the function
-    kfs_list = [k_factor(z, max_iter, inf) for z in pts_list]
-    
-    # print a new line if show_status is True
-    if show_status:
-        print()
+# plot the k-factors of the screen's pixels (see gen_mandelbrot_pixels),
+# coloring each pixel with the average of color_func's colors for it's samples
+def plot_mandel_pixels(kfs, color_func = lambda r : (255,255,255), surface = surf):
+    blit_colors(surface, value_colors(color_func, kfs).mean(axis = 2))
 
-    return (pts_list, kfs_list)
 
+# mapping a point in the Cartesian plane to the screen, and back again
+# (see snowman_map in utils.py), giving the Mandelbrot set the snowman-like
+# orientation
+map_func, inverse_map_func = snowman_map(width, height, scale)
 
-# plot points inside pts_list, by lighting up pixels at
-# those coordinates. color_func decides the color based on
-# the points' coordinates
-def plot_pts(pts_list, color_func = lambda pt : (255,255,255), surface = surf):
-    for pt in pts_list:
-        pt = (int(pt[0]), height - int(pt[1]))      # integer coordinates and y-coordinate flipping
-        surface.set_at(pt, color_func(pt))
 
+# returns the k-factors for every pixel on the screen, as a (width, height, n*n)
+# array, found by walking the pixels and mapping n x n samples inside each of
+# them back into the Cartesian plane with inverse_map_func, instead of sampling
+# the plane and projecting the samples onto the screen (so every pixel gets
+# exactly one value, however large the screen is)
+# map_func sends the real axis along the screen's height and the imaginary
+# axis along it's width, so the samples make up a grid in the plane as well,
+# and the other parameters are the same as gen_mandelbrot_pts's (in mandel.py,
+# including the cache)
+# adaptive and shortcuts are as in calculate_k_factors (in mandel.py)
+def gen_mandelbrot_pixels(n = 1, max_iter = 100, inf = 10, strategy = "full", workers = None, show_status = False, adaptive = False, shortcuts = True):
+    if show_status:
+        print("\n\n")
+
+    xs, ys = pixel_axes(inverse_map_func, width, height, n)
+    kfs = cached_k_factors(lambda : calculate_k_factors(xs, ys, max_iter, inf, strategy, workers, show_status = show_status, adaptive = adaptive, shortcuts = shortcuts),
+                           xs, ys, max_iter, inf, strategy, show_status = show_status, adaptive = adaptive, shortcuts = shortcuts)
 
-# plot points inside pts_list, by lighting up pixels at
-# those coordinates. color_func decides the color based on
-# the k-factor inside kfs_list
-def plot_mandel_pts(pts_list, kfs_list, map_func = lambda pt : pt, color_func = lambda r : (255,255,255), surface = surf):
-    for pt, k in zip(pts_list, kfs_list):
-        x, y = map_func(pt)
-        col = color_func(k)
-        surface.set_at((int(x), int(y)), col)
+    return group_pixel_samples(kfs, n)
 
 
-# mapping a point in the Cartesian plane to the screen,
-# this gives the Mandelbrot set the snowman-like orientation
-def map_func(pt):
-    x = pt.real
-    y = pt.imag
-    return (width/2 + scale*y, height + scale*(x-0.4))
+# if pixel_driven is True, the Mandelbrot set is rendered by walking the
+# screen's pixels, with supersample x supersample samples in each of them,
+# else the Cartesian plane is sampled and the samples are plotted
+# shortcuts turns the interior shortcuts (see k_factors in mandel.py) on or
+# off; with them off, adaptive gives every tile of the screen an iteration
+# budget of it's own instead (see tile_budgets)
+pixel_driven = True
+supersample = 1
+adaptive = False
+shortcuts = True
         
 
 # points for the mandelbrot set
-pts, ks = gen_mandelbrot_pts(-2.66666,0.4,-2.37037,2.37037,0.001, max_iter = 250, inf = 25, show_status = True)
+if pixel_driven:
+    pixel_ks = gen_mandelbrot_pixels(supersample, max_iter = 250, inf = 25, strategy = "subdivide", show_status = True, adaptive = adaptive, shortcuts = shortcuts)
+else:
+    mandel_clouds = gen_mandelbrot_pts(-2.66666,0.4,-2.37037,2.37037,0.001, max_iter = 250, inf = 25, strategy = "subdivide", show_status = True, chunk = 256)
 
 # points for the cap and star atop the Snowmandelbrot
-cap_pts = gen_triangle_pts(width/2, 0.685*height, 0.225*height, 1000000)
-star_pts = gen_star_pts(width/2, 0.87*height, 0.065*height, 42000, pi)
+# (generated in chunks, as they're plotted)
+cap_pts = gen_triangle_pts(width/2, 0.685*height, 0.225*height, 1000000, chunk = chunk_size)
+star_pts = gen_star_pts(width/2, 0.87*height, 0.065*height, 42000, pi, chunk = chunk_size)
 
 # plotting all the generated points
-plot_mandel_pts(pts, ks, map_func, snow, surface=surf)
-plot_pts(cap_pts, lambda pt : (255,0,0), surface=surf)
-plot_pts(star_pts, surface=surf)
+if pixel_driven:
+    plot_mandel_pixels(pixel_ks, snow, surface=surf)
+else:
+    for mandel_cloud in mandel_clouds:
+        plot_mandel_pts(mandel_cloud, map_func, snow, surface=surf)
+plot_chunks(cap_pts, lambda pt : (255,0,0), surface=surf)
+plot_chunks(star_pts, surface=surf)
 
 
 # saving the result in the current working directory
@@ -0,0 +1,178 @@
+"""Tiles
+
+Out-of-core rendering, for images too large for a pygame Surface (or for RAM):
+the image's per-pixel hit counts are kept in a memory-mapped file, split into
+horizontal strips, and the finished image is colored and written to a PNG file
+one strip at a time, so only a strip's worth of it is ever held in memory
+"""
+
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+from utils import *
+
+
+# writes a width x height, 8-bit RGB PNG image to path, a few rows at a time
+# (see write_rows), compressing them as they come in, so that the whole image
+# never has to be held in memory
+# used as a context manager, the image is finished on the way out, unless an
+# exception was raised, in which case the partly written file is removed
+class PNGWriter:
+    def __init__(self, path, width, height, level = 6):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self.file = open(path, "wb")
+        self.compressor = zlib.compressobj(level)
+
+        self.file.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bits per channel, truecolor, no interlacing
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write_chunk(self, kind, data):
+        self.file.write(struct.pack(">I", len(data)) + kind + data)
+        self.file.write(struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    # adds the next rows of the image, an (n, width, 3) uint8 array, top to bottom
+    def write_rows(self, rows):
+        n = rows.shape[0]
+        # every row starts with it's filter type (0, none)
+        data = np.zeros((n, 1 + 3*self.width), dtype = np.uint8)
+        data[:, 1:] = rows.reshape(n, 3*self.width)
+        self.rows += n
+
+        compressed = self.compressor.compress(data.tobytes())
+        if compressed:
+            self.write_chunk(b"IDAT", compressed)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.write_chunk(b"IDAT", self.compressor.flush())
+        self.write_chunk(b"IEND", b"")
+        self.file.close()
+        if self.rows != self.height:
+            os.remove(self.path)
+            raise ValueError("the PNG image has %d rows, instead of %d" % (self.rows, self.height))
+
+    # closes and removes the file, leaving no half-written image behind
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# a width x height histogram of the pixels hit by points (like add_density in
+# utils.py), kept in a memory-mapped file (a temporary one, unless path is given)
+# as horizontal strips of `strip` rows each
+# points are binned to the strips they land on as they're added (see add),
+# and only counted up once max_pending of them are waiting, a strip at a time,
+# with only that strip of the file mapped, so the memory used is bounded by a
+# strip and the pending points, however large the image is
+class TiledCanvas:
+    def __init__(self, width, height, strip = 256, path = None, max_pending = 2**22):
+        self.width = width
+        self.height = height
+        self.strip = strip
+        self.nstrips = -(-height // strip)
+        self.max_pending = max_pending
+        self.max_count = 0
+
+        self.temporary = path is None
+        if self.temporary:
+            fd, path = tempfile.mkstemp(suffix = ".density")
+            os.close(fd)
+        self.path = path
+        # a sparse file of zeros, holding a uint32 count for every pixel, row by row
+        with open(path, "wb") as f:
+            f.truncate(4*width*height)
+
+        self.pending = [[] for s in range(self.nstrips)]
+        self.npending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # the counts of the strip s, as a (rows, width) array mapped from the file
+    def strip_counts(self, s, mode = "r"):
+        y0 = s*self.strip
+        rows = min(self.strip, self.height - y0)
+        return np.memmap(self.path, dtype = np.uint32, mode = mode, offset = 4*y0*self.width, shape = (rows, self.width))
+
+    # adds the points pts (an (N, 2) array, or a PointCloud), binning them by
+    # the strips they land on (points off the image are skipped)
+    def add(self, pts):
+        x, y = screen_pixels(pts, self.height)
+        on_screen = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        idx = np.sort(y[on_screen].astype(np.int64)*self.width + x[on_screen])
+
+        # idx is sorted, so every strip's points are a slice of it
+        bounds = np.searchsorted(idx, np.arange(self.nstrips + 1)*self.strip*self.width)
+        for s in np.nonzero(np.diff(bounds))[0]:
+            self.pending[s].append(idx[bounds[s]:bounds[s+1]])
+        self.npending += idx.size
+
+        if self.npending >= self.max_pending:
+            self.flush()
+
+    # counts up the pending points, strip by strip
+    def flush(self):
+        for s, parts in enumerate(self.pending):
+            if not parts:
+                continue
+            pixels, hits = np.unique(np.concatenate(parts) - s*self.strip*self.width, return_counts = True)
+            counts = self.strip_counts(s, "r+")
+            flat = counts.reshape(-1)
+            flat[pixels] += hits.astype(np.uint32)
+            self.max_count = max(self.max_count, int(flat[pixels].max()))
+            counts.flush()
+            del counts, flat
+            self.pending[s] = []
+        self.npending = 0
+
+    # yields (y0, counts) for every strip, top to bottom, counts being the
+    # strip's (rows, width) array of counts, starting at the row y0
+    def strips(self):
+        self.flush()
+        for s in range(self.nstrips):
+            yield (s*self.strip, np.array(self.strip_counts(s)))
+
+    # colors the pixels that were hit, a strip at a time, and writes them to a
+    # PNG file at path, the way plot_density in others/star/star.py does:
+    # color_func decides their colors based on their screen coordinates, and
+    # if log_tone is True, the colors are faded towards black for pixels hit
+    # only a few times, going by the logarithm of their hit counts
+    # the pixels that weren't hit are given the color background
+    def save_png(self, path, color_func = lambda pt : (255,255,255), background = (0,0,0), log_tone = False):
+        with PNGWriter(path, self.width, self.height) as png:
+            for y0, counts in self.strips():
+                ys, xs = np.nonzero(counts)
+                cols = pixel_colors(color_func, xs, ys + y0)
+                if log_tone and xs.size:
+                    cols = cols*(np.log1p(counts[ys, xs])/np.log1p(self.max_count))[:, None]
+
+                rows = np.empty(counts.shape + (3,), dtype = np.uint8)
+                rows[:] = background
+                rows[ys, xs] = cols
+                png.write_rows(rows)
+
+    # deletes the file, if it's a temporary one
+    def close(self):
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)